@@ -0,0 +1,301 @@
+"""
+Offline batch processing of whole directories of specs.
+
+    python batch.py uploads/ "Drafts/*.pdf" --focus "Nozzle Load Analysis"
+
+Each PDF goes through the same stages as the /upload/ endpoint, pipelined:
+Marker extraction on a process pool, OpenAI analysis on a thread pool and
+report rendering on a second process pool. Progress is recorded in a JSON
+manifest keyed by the PDF's content hash, so an interrupted run resumes
+where it stopped and duplicate files are processed once. A throughput
+summary is printed and written next to the manifest at the end.
+"""
+import argparse
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+
+from services.file_service import file_digest
+from services.pdf_service import (
+    EXTRACTION_PROFILES,
+    DEFAULT_PROFILE,
+    extract_text_from_pdf,
+    analyze_text,
+    render_report,
+    REPORTS_DIR,
+)
+from services.parameter_service import extract_parameters, format_parameter_summary
+from services.reference_service import ReferenceIndex
+from services.artifact_service import ArtifactStore
+from services.report_service import ReportStore, report_id
+from services.scheduler_service import configure_worker
+from services.profile_service import merge_folded, sampled_call, save_profile, stage as profile_stage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROCESSED_DIR = Path("processed")
+
+
+def collect_pdfs(inputs: list[str]) -> list[Path]:
+    """Expand directories (recursively) and glob patterns into PDF paths."""
+    found = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            found.extend(sorted(path.rglob("*.pdf")))
+        elif path.is_file():
+            found.append(path)
+        else:
+            found.extend(Path(p) for p in sorted(glob.glob(item, recursive=True)))
+    return [p for p in found if p.suffix.lower() == ".pdf"]
+
+
+class Manifest:
+    """Per-content-hash job state, saved atomically after every change."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.jobs: dict[str, dict] = {}
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as fh:
+                self.jobs = json.load(fh)
+
+    def update(self, digest: str, **fields) -> None:
+        self.jobs.setdefault(digest, {}).update(fields)
+        self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(self.jobs, indent=2), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+def _extract_job(pdf_path: str, profile: str, sample: bool = False) -> tuple[str, float, str]:
+    started = time.perf_counter()
+    text, folded = sampled_call(sample, _staged, "extract", extract_text_from_pdf, pdf_path, profile=profile)
+    return text, time.perf_counter() - started, folded
+
+
+def _render_job(processed_text: str, user_input: str, output_pdf_path: str, sample: bool = False) -> tuple[str, float, str]:
+    started = time.perf_counter()
+    _, folded = sampled_call(sample, _staged, "render", render_report, processed_text, user_input, output_pdf_path)
+    return output_pdf_path, time.perf_counter() - started, folded
+
+
+def _staged(name: str, fn, *args, **kwargs):
+    with profile_stage(name):
+        return fn(*args, **kwargs)
+
+
+def run_batch(
+    pdfs: list[Path],
+    user_input: str,
+    manifest: Manifest,
+    extract_workers: int = 1,
+    llm_workers: int = 4,
+    render_workers: int = 2,
+    profile: str = DEFAULT_PROFILE,
+    sample: bool = False,
+) -> dict:
+    """
+    Process ``pdfs`` through the three-stage pipeline and return a summary.
+    With ``sample`` every stage runs under the sampling profiler and each
+    job's combined flame graph and summary are saved next to its artifact.
+    """
+    artifacts = ArtifactStore(PROCESSED_DIR / "artifacts")
+    reports = ReportStore(REPORTS_DIR)
+    references = ReferenceIndex(PROCESSED_DIR / "reference_index.json")
+    analyses_dir = manifest.path.parent / "analyses"
+    analyses_dir.mkdir(parents=True, exist_ok=True)
+
+    # One job per distinct content hash (and extraction profile)
+    jobs: dict[str, Path] = {}
+    for pdf in pdfs:
+        jobs.setdefault(f"{file_digest(str(pdf))}-{profile}", pdf)
+
+    stage_seconds = {"extract": 0.0, "analyze": 0.0, "render": 0.0}
+    counts = {"done": 0, "skipped": 0, "failed": 0, "duplicates": len(pdfs) - len(jobs)}
+    job_stacks: dict[str, Counter] = {}
+    started = time.perf_counter()
+
+    # Split the cores between extraction processes instead of oversubscribing
+    threads = max((os.cpu_count() or 1) // extract_workers, 1)
+
+    # Spawned, not forked: workers must not inherit the parent's CUDA or
+    # torch thread state. Each takes the next device from the shared counter
+    spawn = multiprocessing.get_context("spawn")
+    worker_counter = spawn.Value("i", 0)
+
+    with ProcessPoolExecutor(
+        extract_workers,
+        mp_context=spawn,
+        initializer=configure_worker,
+        initargs=(threads, worker_counter)
+    ) as extract_pool, \
+            ThreadPoolExecutor(llm_workers) as llm_pool, \
+            ProcessPoolExecutor(render_workers) as render_pool:
+
+        pending = {}
+
+        def analyze(pdf: Path, text: str, reference_summary: str):
+            job_started = time.perf_counter()
+            analysis, folded = sampled_call(
+                sample,
+                _staged,
+                "analyze",
+                analyze_text,
+                f"\n\n--- File: {pdf.name} ---\n{text}",
+                user_input=user_input,
+                parameter_summary=format_parameter_summary(extract_parameters(text, pdf.name)),
+                reference_summary=reference_summary,
+            )
+            return analysis, time.perf_counter() - job_started, folded
+
+        def save_job_profile(digest: str, pdf: Path):
+            if digest in job_stacks:
+                paths = save_profile(job_stacks.pop(digest), artifacts.directory, digest, title=pdf.name)
+                manifest.update(digest, profile=paths["flamegraph"])
+
+        def submit_analysis(digest: str, pdf: Path):
+            text = artifacts.open(digest).text()
+            references.add_document(pdf.name, text)
+            future = llm_pool.submit(analyze, pdf, text, references.summary_for([pdf.name]))
+            pending[future] = ("analyze", digest, pdf)
+
+        def save_inputs(digest: str, pdf: Path):
+            # What the report was built from, for /rfq/ and other readers
+            reports.save_inputs(
+                report_id([digest], user_input),
+                [{"file": pdf.name, "artifact_id": digest}],
+                user_input
+            )
+
+        def submit_render(digest: str, pdf: Path, analysis: str):
+            output = str(reports.output_path(report_id([digest], user_input)))
+            pending[render_pool.submit(_render_job, analysis, user_input, output, sample)] = ("render", digest, pdf)
+
+        for digest, pdf in jobs.items():
+            state = manifest.jobs.get(digest, {})
+            same_focus = state.get("focus") == user_input
+            previous_status = state.get("status")
+            if previous_status == "done" and same_focus:
+                counts["skipped"] += 1
+                continue
+            # Same file, focus, prompt and model already reported (e.g. via /upload/)
+            existing = reports.path(report_id([digest], user_input))
+            if existing is not None:
+                counts["skipped"] += 1
+                if reports.inputs(existing.stem) is None:
+                    save_inputs(digest, pdf)
+                manifest.update(digest, file=str(pdf), focus=user_input, status="done", output=str(existing), error=None)
+                continue
+            manifest.update(digest, file=str(pdf), focus=user_input, status="queued", error=None)
+
+            analysis_path = analyses_dir / f"{digest}.txt"
+            if previous_status == "analyzed" and same_focus and analysis_path.exists():
+                submit_render(digest, pdf, analysis_path.read_text(encoding="utf-8"))
+            elif artifacts.open(digest) is not None:
+                submit_analysis(digest, pdf)
+            else:
+                pending[extract_pool.submit(_extract_job, str(pdf), profile, sample)] = ("extract", digest, pdf)
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, digest, pdf = pending.pop(future)
+                try:
+                    result, seconds, folded = future.result()
+                except Exception as e:
+                    logger.error(f"{stage} failed for {pdf}: {str(e)}")
+                    counts["failed"] += 1
+                    manifest.update(digest, status="failed", error=f"{stage}: {str(e)}")
+                    save_job_profile(digest, pdf)
+                    continue
+
+                if folded:
+                    merge_folded(job_stacks.setdefault(digest, Counter()), folded)
+
+                stage_seconds[stage] += seconds
+                if stage == "extract":
+                    artifacts.write(digest, result)
+                    manifest.update(digest, status="extracted")
+                    submit_analysis(digest, pdf)
+                elif stage == "analyze":
+                    (analyses_dir / f"{digest}.txt").write_text(result, encoding="utf-8")
+                    manifest.update(digest, status="analyzed")
+                    submit_render(digest, pdf, result)
+                else:
+                    counts["done"] += 1
+                    save_inputs(digest, pdf)
+                    manifest.update(digest, status="done", output=result)
+                    save_job_profile(digest, pdf)
+                    logger.info(f"Finished {pdf} -> {result}")
+
+    references.save()
+    elapsed = time.perf_counter() - started
+    return {
+        "files": len(pdfs),
+        **counts,
+        "elapsed_seconds": round(elapsed, 2),
+        "files_per_minute": round(counts["done"] / elapsed * 60, 2) if elapsed else 0.0,
+        "stage_seconds": {k: round(v, 2) for k, v in stage_seconds.items()},
+        "workers": {"extract": extract_workers, "analyze": llm_workers, "render": render_workers},
+        "profile": profile,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-process directories of spec PDFs")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--focus", default="Analyze entire document", help="Focus area passed to the analysis")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(EXTRACTION_PROFILES))
+    parser.add_argument("--manifest", default=str(PROCESSED_DIR / "batch" / "manifest.json"))
+    parser.add_argument("--extract-workers", type=int, default=1, help="Marker processes (each loads its own models)")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Concurrent OpenAI requests")
+    parser.add_argument("--render-workers", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)))
+    parser.add_argument("--sample-profile", action="store_true",
+                        help="Profile every job; flame graphs are saved next to the artifacts")
+    args = parser.parse_args()
+
+    pdfs = collect_pdfs(args.inputs)
+    if not pdfs:
+        parser.error("No PDF files found")
+
+    manifest = Manifest(Path(args.manifest))
+    summary = run_batch(
+        pdfs,
+        args.focus,
+        manifest,
+        extract_workers=args.extract_workers,
+        llm_workers=args.llm_workers,
+        render_workers=args.render_workers,
+        profile=args.profile,
+        sample=args.sample_profile,
+    )
+
+    summary_path = manifest.path.with_name("summary.json")
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    print("\n" + "=" * 50)
+    print(f"Processed {summary['done']} of {summary['files']} files "
+          f"({summary['skipped']} skipped, {summary['duplicates']} duplicates, {summary['failed']} failed)")
+    print(f"Elapsed: {summary['elapsed_seconds']}s, {summary['files_per_minute']} files/min")
+    print(f"Stage busy time: {summary['stage_seconds']}")
+    print(f"Summary written to {summary_path}")
+    print("=" * 50 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Micro-benchmark for report formatting over the saved drafts.
+
+    python benchmark_format.py "Drafts/*.txt" --repeat 50
+
+Compares the previous formatter (several whole-text passes, keyword lists
+rebuilt per line, then a second classification in the renderer) with the
+single-pass classifier in services.format_service. The plain-text output of
+both is checked to be identical before anything is timed; ReportLab layout
+is the same for both and is left out.
+"""
+import argparse
+import glob
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+
+from services.format_service import format_report_lines, lines_to_text
+
+
+def legacy_format(text: str, user_input: str) -> str:
+    """format_processed_text as it was before the single-pass classifier."""
+    if not text:
+        return "No content available."
+
+    text = re.sub(r'<[^>]*>', '', text)
+    text = text.replace('&nbsp;', ' ')
+    text = text.replace('&bull;', '•')
+    text = text.replace('\u2011', '-')
+    text = text.replace('\u2013', '-')
+    text = text.replace('\u2014', '-')
+
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    formatted = [
+        "ENGINEERING SPECIFICATION ANALYSIS",
+        f"Focus Area: {user_input if user_input else 'Entire Document'}",
+        f"Generated on {datetime.now().strftime('%B %d, %Y')}",
+        "",
+    ]
+    for line in lines:
+        l = line.strip()
+        lower = l.lower()
+        if any(kw in lower for kw in [
+            "purpose and scope", "applicable codes", "design and performance",
+            "material and component", "loads, allowables", "loads and allowables",
+            "execution, testing", "execution requirements", "client inputs",
+            "client requirements"
+        ]):
+            formatted.append("")
+            formatted.append(l)
+        elif any(kw in lower for kw in [
+            "requirements:", "standard:", "standards:", "specification:",
+            "specifications:", "data:", "table", "note:"
+        ]):
+            formatted.append("")
+            formatted.append(f"[SUBSECTION] {l}")
+        elif l.startswith(("•", "-", "*")) or (l[:3].isdigit() and l[3:4] in {".", ")"}):
+            clean = re.sub(r'^[\-\*\•\d\)\.\s]+', '', l).strip()
+            formatted.append(f"  • {clean}")
+        elif "(from" in lower:
+            formatted.append(f"    [SOURCE] {l}")
+        else:
+            formatted.append(l)
+    formatted.append("")
+    formatted.append("END OF ENGINEERING SPECIFICATION ANALYSIS")
+    return "\n".join(formatted)
+
+
+def legacy_render_kinds(formatted: str) -> list[str]:
+    """The classification create_styled_document used to redo per line."""
+    section_keywords = [
+        "purpose and scope", "applicable codes", "design and performance",
+        "material and component", "material and component specifications",
+        "loads, allowables", "loads and allowables", "execution, testing",
+        "execution requirements", "client inputs", "client requirements",
+    ]
+    kinds = []
+    for raw_line in formatted.split("\n"):
+        line = raw_line.strip()
+        if not line:
+            kinds.append("blank")
+            continue
+        lower = line.lower()
+        if any(lower.startswith(kw) or kw in lower[:40] for kw in section_keywords):
+            kinds.append("section")
+        elif line.startswith("[SUBSECTION] "):
+            kinds.append("subsection")
+        elif line.startswith("•") or line.startswith("  •"):
+            kinds.append("bullet")
+        elif line.startswith("[SOURCE] ") or line.strip().startswith("    [SOURCE]"):
+            kinds.append("source")
+        elif line.startswith("END OF"):
+            kinds.append("end")
+        else:
+            kinds.append("body")
+    return kinds
+
+
+def time_it(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark report formatting")
+    parser.add_argument("patterns", nargs="*", default=["Drafts/*.txt"])
+    parser.add_argument("--focus", default="Nozzle Load Analysis")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    paths = sorted({Path(p) for pattern in args.patterns for p in glob.glob(pattern)})
+    if not paths:
+        parser.error("No draft files found")
+
+    print(f"{'file':<28}{'KB':>8}{'legacy ms':>12}{'single ms':>12}{'speedup':>9}")
+    total_old = total_new = 0.0
+    for path in paths:
+        text = path.read_text(encoding="utf-8", errors="replace")
+        if legacy_format(text, args.focus) != lines_to_text(format_report_lines(text, args.focus)):
+            raise SystemExit(f"Formatted output differs for {path}")
+
+        old = time_it(lambda: legacy_render_kinds(legacy_format(text, args.focus)), args.repeat)
+        new = time_it(lambda: format_report_lines(text, args.focus), args.repeat)
+        total_old += old
+        total_new += new
+        print(f"{path.name[:27]:<28}{len(text) / 1024:>8.1f}{old * 1000:>12.3f}{new * 1000:>12.3f}{old / new:>8.2f}x")
+
+    print(f"{'total':<28}{'':>8}{total_old * 1000:>12.3f}{total_new * 1000:>12.3f}{total_old / total_new:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,54 @@
 import os
+import re
 import logging
+from email.utils import formatdate
+from functools import partial
 from pathlib import Path
 from typing import List
-from fastapi import FastAPI, UploadFile, File, HTTPException, status, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, status, Form, Request, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 import uvicorn
 
 # Local imports
-from services.file_service import save_upload_file, get_unique_filename
+from services.file_service import save_upload_file, get_unique_filename, file_digest
 from services.pdf_service import (
     process_pdf,
     extract_text_from_pdf,
+    page_fingerprints,
+    pdf_page_count,
+    PAGE_CACHE,
+    EXTRACTION_PROFILES,
+    DEFAULT_PROFILE,
+    NoTextExtracted,
     process_with_openai,
     format_processed_text,
     convert_txt_to_pdf
 )
+from services.parameter_service import (
+    ParameterTable,
+    extract_parameters,
+    format_parameter_summary,
+    register_parameters,
+    lookup_parameters
+)
+from services.reference_service import ReferenceIndex
+from services.revision_service import RevisionStore, extract_incremental
+from services.artifact_service import ArtifactStore
+from services.scheduler_service import get_scheduler
+from services.profile_service import profiled, stage
+from services.rfq_service import RFQPacket, RFQ_TEMPLATES, generate_rfqs, stream_zip
+from services.admission_service import AdmissionController, Overloaded, estimate_cost
+from services.report_service import (
+    ReportStore,
+    RangeNotSatisfiable,
+    report_id,
+    cache_control,
+    etag_matches,
+    parse_range,
+    iter_file_range
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +62,21 @@ PROCESSED_DIR = Path("processed")
 UPLOAD_DIR.mkdir(exist_ok=True)
 PROCESSED_DIR.mkdir(exist_ok=True)
 
+# Codes/standards/document-number index shared by all uploads
+REFERENCE_INDEX = ReferenceIndex(PROCESSED_DIR / "reference_index.json")
+
+# Latest extraction/analysis per document number, for incremental revisions
+REVISION_STORE = RevisionStore(PROCESSED_DIR / "revisions")
+
+# Compressed per-file extractions, addressed by the source PDF's hash
+ARTIFACT_STORE = ArtifactStore(PROCESSED_DIR / "artifacts")
+
+# Generated _Specs.pdf reports, served by id with ETags
+REPORT_STORE = ReportStore(PROCESSED_DIR)
+
+# Bounded, per-client-fair admission for /upload/
+ADMISSION = AdmissionController()
+
 app = FastAPI(
     title="PDF Processing API",
     description="API for processing PDF files through text extraction and AI analysis",
@@ -54,20 +102,179 @@ async def get_video():
     return {"error": "Video not found"}, 404
 
 
+def remove_files(paths: list[str]) -> None:
+    """Best-effort removal of saved uploads after a failed or rejected request"""
+    for f in paths:
+        try:
+            os.remove(f)
+        except:
+            pass
+
+
+def run_job(sample: bool, name: str, fn, *args) -> dict:
+    """
+    Run a blocking job on the current thread. With ``sample`` it runs under
+    the sampling profiler and a flame graph plus hot-function summary are
+    saved next to the artifacts as ``<name>_profile.*`` (also when the job
+    fails); their paths are returned in the result under "profile".
+    """
+    with profiled(sample) as profiler:
+        try:
+            result = fn(*args)
+        finally:
+            if profiler is not None:
+                profiler.stop()
+                paths = profiler.save(ARTIFACT_STORE.directory, name, title=f"Upload {name}")
+                logger.info(f"Profile saved: {paths['flamegraph']}")
+    if profiler is not None:
+        result["profile"] = paths
+    return result
+
+
+def run_upload_pipeline(
+    saved_files: list[str],
+    filenames: list[str],
+    artifact_ids: list[str],
+    user_input: str,
+    profile: str,
+    report: str
+) -> dict:
+    """
+    Extract, analyze and render an admitted upload into report ``report``.
+    Blocking: runs in a worker thread so the event loop keeps answering
+    (and rejecting) requests.
+    """
+    artifacts = []
+    parameters = ParameterTable()
+    revisions = []
+
+    # Extract text from each file
+    for file_path, filename, artifact_id in zip(saved_files, filenames, artifact_ids):
+        try:
+            with stage("extract"):
+                processed_text, revision = extract_incremental(
+                    file_path,
+                    filename,
+                    REVISION_STORE,
+                    partial(extract_text_from_pdf, profile=profile),
+                    page_fingerprints,
+                    profile=profile
+                )
+            revisions.append(revision)
+            ARTIFACT_STORE.write(artifact_id, processed_text)
+            artifacts.append((filename, artifact_id))
+            file_parameters = extract_parameters(processed_text, filename)
+            register_parameters(file_parameters)
+            parameters.extend(file_parameters)
+            REFERENCE_INDEX.add_document(filename, processed_text)
+            logger.info(f"Extracted {len(processed_text)} characters from {filename}")
+        except NoTextExtracted as e:
+            logger.warning(f"No text extracted from {filename}: {str(e)}")
+            remove_files(saved_files)
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{filename}: {str(e)}"
+            )
+        except Exception as e:
+            logger.error(f"Error extracting text from {filename}: {str(e)}")
+            # Clean up any saved files if there's an error
+            remove_files(saved_files)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error processing {filename}: {str(e)}"
+            )
+
+    REFERENCE_INDEX.save()
+
+    # Assemble the combined prompt once from the stored artifacts
+    all_processed_text = "".join(
+        f"\n\n--- File: {name} ---\n{ARTIFACT_STORE.open(artifact_id).text()}"
+        for name, artifact_id in artifacts
+    )
+
+    # A single known document with a previous analysis for this focus
+    # area only needs its changed sections re-analyzed
+    revision = None
+    if len(filenames) == 1 and revisions[0].get("previous"):
+        previous_analysis = revisions[0]["previous_analyses"].get(user_input)
+        if previous_analysis:
+            revision = dict(
+                revisions[0],
+                file_name=filenames[0],
+                previous_analysis=previous_analysis
+            )
+
+    try:
+        # Process all files together with the user input
+        output_pdf_path, processed_text = process_pdf(
+            saved_files[0],  # Use first file's path for naming
+            user_input=user_input,
+            combined_text=all_processed_text,
+            parameter_summary=format_parameter_summary(parameters),
+            reference_summary=REFERENCE_INDEX.summary_for(filenames),
+            revision=revision,
+            output_pdf_path=str(REPORT_STORE.output_path(report))
+        )
+        # An identical job may have published this report first; its
+        # files are kept, so answer with what was published
+        processed_text = REPORT_STORE.analysis(report) or processed_text
+        REPORT_STORE.save_inputs(
+            report,
+            [{"file": name, "artifact_id": artifact_id} for name, artifact_id in artifacts],
+            user_input
+        )
+        if len(filenames) == 1 and revisions[0].get("entry"):
+            REVISION_STORE.save_analysis(
+                revisions[0]["entry"], user_input, processed_text
+            )
+    except Exception as e:
+        logger.error(f"Error in final processing: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error in final processing: {str(e)}"
+        )
+
+    logger.info(f"Files processed successfully. Output: {output_pdf_path}")
+    return upload_response(filenames, artifact_ids, report, processed_text)
+
+
+def upload_response(filenames: list[str], artifact_ids: list[str], report: str, processed_text: str) -> dict:
+    return {
+        "success": True,
+        "message": f"Successfully processed {len(filenames)} files",
+        "file_path": str(REPORT_STORE.output_path(report)),
+        "report_id": report,
+        "processed_text": processed_text,
+        "artifacts": [
+            {"file": name, "artifact_id": artifact_id}
+            for name, artifact_id in zip(filenames, artifact_ids)
+        ]
+    }
+
+
 @app.post("/upload/")
 async def upload_file(
+    request: Request,
     files: list[UploadFile] = File(..., description="PDF files to process"),
-    user_input: str = Form("", description="Additional input text to include in processing")
+    user_input: str = Form("", description="Additional input text to include in processing"),
+    profile: str = Form(DEFAULT_PROFILE, description="Extraction profile: " + ", ".join(EXTRACTION_PROFILES))
 ):
     """
     Upload multiple PDF files for processing.
     
     The uploaded files will be processed as follows:
     1. Each file is saved to the uploads directory with a unique name
-    2. Text is extracted from each file using Marker library
-    3. Extracted text from all files is combined
-    4. Combined text is processed by OpenAI with the user input
-    5. Result is converted to a single PDF with '_Specs' suffix
+    2. The request is admitted (or rejected with 429/503 and Retry-After)
+       based on its page count and size
+    3. Text is extracted from each file using Marker library
+    4. Extracted text from all files is combined
+    5. Combined text is processed by OpenAI with the user input
+    6. Result is converted to a single PDF with '_Specs' suffix
+
+    Send ``X-Profile: 1`` to run the job under the sampling profiler; the
+    flame graph and summary are then served from /profiles/{report_id}.
+    A profiled job always runs; if the report already exists its output is
+    written to a separate ``<report_id>_profiled`` report.
     
     Returns:
         JSONResponse: Contains success status, message, and path to the processed PDF
@@ -78,70 +285,95 @@ async def upload_file(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No files provided"
             )
+        if profile not in EXTRACTION_PROFILES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown extraction profile '{profile}'. Choose one of: {', '.join(EXTRACTION_PROFILES)}"
+            )
 
         logger.info(f"Received {len(files)} files for processing")
+
+        # Clients already at their limit are turned away before any upload
+        # is saved, hashed or costed
+        client = request.headers.get("X-Client-Id") or (
+            request.client.host if request.client else "anonymous"
+        )
+        try:
+            ADMISSION.check_client(client)
+        except Overloaded as e:
+            logger.warning(f"Rejected upload from {client}: {e.detail}")
+            raise HTTPException(
+                status_code=e.status_code,
+                detail=e.detail,
+                headers={"Retry-After": str(e.retry_after)}
+            )
         
+        # Save the uploaded files
         saved_files = []
-        all_processed_text = ""
-        
-        # Process each uploaded file
         for file in files:
             try:
-                # 1. Save the uploaded file
                 file_path = await save_upload_file(file, UPLOAD_DIR / file.filename)
                 logger.info(f"File saved to: {file_path}")
                 saved_files.append(file_path)
-                
-                # 2. Extract text from the file
-                try:
-                    processed_text = extract_text_from_pdf(file_path)
-                    all_processed_text += f"\n\n--- File: {file.filename} ---\n{processed_text}"
-                    print(f"content: {all_processed_text}")
-                except Exception as e:
-                    logger.error(f"Error extracting text from {file.filename}: {str(e)}")
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Error processing {file.filename}: {str(e)}"
-                    )
-                    
             except Exception as e:
                 logger.error(f"Error processing file {file.filename}: {str(e)}")
-                # Clean up any saved files if there's an error
-                for f in saved_files:
-                    try:
-                        os.remove(f)
-                    except:
-                        pass
+                remove_files(saved_files)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail=f"Error processing {file.filename}: {str(e)}"
                 )
-        
+
+        # Identical inputs, focus, prompt and model: reuse the existing report
+        filenames = [file.filename for file in files]
+        # Hashing and page counting read whole files: keep them off the event loop
+        artifact_ids = [f"{await run_in_threadpool(file_digest, f)}-{profile}" for f in saved_files]
+        report = report_id(artifact_ids, user_input)
+        sample = request.headers.get("X-Profile", "").lower() in ("1", "true", "yes")
+        existing = None if sample else REPORT_STORE.analysis(report)
+        if existing is not None:
+            logger.info(f"Reusing report {report}")
+            remove_files(saved_files)
+            return JSONResponse(content=upload_response(filenames, artifact_ids, report, existing))
+        # A profiled re-run gets its own report id: a published content id is
+        # served as immutable and must never be rewritten
+        if sample and REPORT_STORE.path(report) is not None:
+            report = f"{report}_profiled"
+
+        # Admission: cost from pages and bytes, fair across clients
+        cost = estimate_cost(
+            sum([await run_in_threadpool(pdf_page_count, f) for f in saved_files]),
+            sum(os.path.getsize(f) for f in saved_files)
+        )
         try:
-            # Process all files together with the user input
-            output_pdf_path, processed_text = process_pdf(
-                saved_files[0],  # Use first file's path for naming
-                user_input=user_input,
-                combined_text=all_processed_text
-            )
-            
-            logger.info(f"Files processed successfully. Output: {output_pdf_path}")
-            
-            return JSONResponse(
-                content={
-                    "success": True,
-                    "message": f"Successfully processed {len(files)} files",
-                    "file_path": output_pdf_path,
-                    "processed_text": processed_text
-                }
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in final processing: {str(e)}")
+            async with ADMISSION.admit(client, cost):
+                # An identical upload may have finished while this one waited
+                existing = None if sample else REPORT_STORE.analysis(report)
+                if existing is not None:
+                    logger.info(f"Reusing report {report} finished while queued")
+                    remove_files(saved_files)
+                    return JSONResponse(content=upload_response(filenames, artifact_ids, report, existing))
+                result = await run_in_threadpool(
+                    run_job,
+                    sample,
+                    report,
+                    run_upload_pipeline,
+                    saved_files,
+                    filenames,
+                    artifact_ids,
+                    user_input,
+                    profile,
+                    report
+                )
+        except Overloaded as e:
+            logger.warning(f"Rejected upload from {client} (cost {cost:.0f}): {e.detail}")
+            remove_files(saved_files)
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error in final processing: {str(e)}"
+                status_code=e.status_code,
+                detail=e.detail,
+                headers={"Retry-After": str(e.retry_after)}
             )
+
+        return JSONResponse(content=result)
             
     except HTTPException:
         raise
@@ -151,27 +383,236 @@ async def upload_file(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An unexpected error occurred: {str(e)}"
         )
+def serve_report(request: Request, report_id: str):
+    """Send a report with its ETag, honouring If-None-Match and Range."""
+    path = REPORT_STORE.path(report_id)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Report {report_id} not found"
+        )
+    etag, stat = REPORT_STORE.etag(path)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control(report_id),
+        "Accept-Ranges": "bytes",
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True)
+    }
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # A stale If-Range means the client's partial copy is outdated: send it all
+    if_range = request.headers.get("If-Range")
+    byte_range = None
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), stat.st_size)
+        except RangeNotSatisfiable as e:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": str(e)}
+            )
+
+    filename = path.name
+    headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    if byte_range is None:
+        return FileResponse(path, media_type="application/pdf", headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        iter_file_range(path, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type="application/pdf",
+        headers=headers
+    )
+
+@app.get("/reports/{report_id}")
+async def get_report(request: Request, report_id: str):
+    """
+    Download a generated report by id (its file name without ``.pdf``).
+    Supports conditional requests (ETag / If-None-Match) and byte ranges.
+    """
+    return serve_report(request, report_id)
+
 @app.get("/download/")
-async def download_file(output_pdf_path):
+async def download_file(request: Request, output_pdf_path: str):
+    """Download a report by the ``file_path`` returned from /upload/."""
+    path = Path(output_pdf_path)
+    if path.parent.resolve() != PROCESSED_DIR.resolve() or path.suffix != ".pdf":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Report {output_pdf_path} not found"
+        )
+    return serve_report(request, path.stem)
+
+@app.post("/rfq/")
+async def create_rfqs(
+    report_id: str = Body(..., description="Report whose analysis the RFQs are built from"),
+    vendors: list[dict] = Body(..., description="Vendors: name, contact, email, notes, scope (analysis section numbers)"),
+    template: str = Body("standard", description="Template name (" + ", ".join(RFQ_TEMPLATES) + ") or template text"),
+    due_date: str = Body("", description="Quotation due date shown on every RFQ"),
+    rfq_prefix: str = Body(None, description="RFQ number prefix, numbered per vendor")
+):
+    """
+    Generate one RFQ per vendor from a finished report and stream them as a zip.
+
+    The analysis, extraction artifacts and parameters of the report are
+    reused, so no extraction or OpenAI call is made whatever the vendor count.
+    """
+    if not vendors or any(not isinstance(v, dict) or not v.get("name") for v in vendors):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Every vendor needs a name"
+        )
+    if "$" not in template and template not in RFQ_TEMPLATES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown RFQ template '{template}'. Choose one of: {', '.join(RFQ_TEMPLATES)}"
+        )
+    analysis = REPORT_STORE.analysis(report_id)
+    if analysis is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Report {report_id} not found"
+        )
+
+    # Parameters from the in-process index, else re-parsed from the stored extraction
+    recorded = REPORT_STORE.inputs(report_id) or {"focus": "", "inputs": []}
+    parameters = ParameterTable()
+    for entry in recorded["inputs"]:
+        file_parameters = lookup_parameters(file=entry["file"])
+        if not len(file_parameters):
+            artifact = ARTIFACT_STORE.open(entry["artifact_id"])
+            if artifact is not None:
+                file_parameters = extract_parameters(artifact.text(), entry["file"])
+                artifact.close()
+        parameters.extend(file_parameters)
+    documents = [entry["file"] for entry in recorded["inputs"]]
+
+    packet = RFQPacket(
+        analysis,
+        recorded["focus"],
+        documents,
+        parameters=parameters,
+        references=REFERENCE_INDEX.summary_for(documents)
+    )
+    # Render every RFQ before the first byte is sent, so a failed render is
+    # a 500 rather than a truncated zip
     try:
-        return FileResponse(
-            output_pdf_path,
-            media_type="application/pdf",
-            filename=os.path.basename(output_pdf_path)
+        entries = await run_in_threadpool(
+            list,
+            generate_rfqs(
+                packet,
+                vendors,
+                template=template,
+                due_date=due_date,
+                rfq_prefix=rfq_prefix or f"RFQ-{report_id[:8].upper()}"
+            )
         )
     except Exception as e:
-        logger.error(f"Error downloading file: {str(e)}")
+        logger.error(f"Error rendering RFQs for {report_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error downloading file: {str(e)}"
+            detail=f"Error rendering RFQs: {str(e)}"
+        )
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{report_id}_RFQs.zip"'}
+    )
+
+@app.get("/parameters/")
+async def get_parameters(
+    file: str = None,
+    quantity: str = None,
+    name: str = None,
+    page: int = None
+):
+    """
+    Look up numeric parameters extracted from uploaded documents.
+
+    Filters are optional: ``file`` and ``quantity`` (pressure, temperature,
+    length, force, moment) match exactly, ``name`` is a substring match.
+    """
+    table = lookup_parameters(file=file, quantity=quantity, name=name, page=page)
+    return {"count": len(table), "columns": table.to_columns()}
+
+@app.get("/references/")
+async def get_references(q: str = "", kind: str = None, file: str = None):
+    """
+    Query the codes-and-standards index.
+
+    ``q`` is a loose designation (``api 650``, ``B31.3``, ``7650-8230``);
+    ``kind`` is ``standard`` or ``document``; ``file`` restricts to one file.
+    Returns each matching designation with the files and pages citing it.
+    """
+    results = REFERENCE_INDEX.search(q, kind=kind, file=file)
+    return {"count": len(results), "references": results}
+
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str, page: int = None, section: str = None):
+    """
+    Read a stored extraction, or just one page or section of it.
+    Lists the available pages and sections when neither is given.
+    """
+    valid_id = re.fullmatch(r"[A-Za-z0-9-]+", artifact_id)
+    artifact = ARTIFACT_STORE.open(artifact_id) if valid_id else None
+    if artifact is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Artifact {artifact_id} not found"
         )
+    try:
+        if page is not None:
+            return {"artifact_id": artifact_id, "page": page, "text": artifact.page(page)}
+        if section is not None:
+            return {"artifact_id": artifact_id, "section": section, "text": artifact.section(section)}
+        return {
+            "artifact_id": artifact_id,
+            "length": len(artifact),
+            "pages": artifact.page_numbers,
+            "sections": artifact.section_labels
+        }
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    finally:
+        artifact.close()
+
+@app.get("/profiles/{job_id}")
+async def get_profile(job_id: str, format: str = "svg"):
+    """
+    Profile saved for a job run with ``X-Profile: 1``: the flame graph
+    (``svg``), hot-function summary (``txt``) or collapsed stacks (``folded``).
+    """
+    media_types = {"svg": "image/svg+xml", "txt": "text/plain", "folded": "text/plain"}
+    path = ARTIFACT_STORE.directory / f"{job_id}_profile.{format}"
+    if format not in media_types or not re.fullmatch(r"[A-Za-z0-9_-]+", job_id) or not path.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {format} profile for {job_id}"
+        )
+    return FileResponse(path, media_type=media_types[format])
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Upload queue depth, active jobs and wait times"""
+    return ADMISSION.stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Page-level extraction cache hit statistics since startup"""
+    return PAGE_CACHE.stats()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "upload_dir": str(UPLOAD_DIR.absolute()),
-        "processed_dir": str(PROCESSED_DIR.absolute())
+        "processed_dir": str(PROCESSED_DIR.absolute()),
+        "extraction": get_scheduler().stats()
     }
 
 def get_local_ip():
@@ -1,5 +1,6 @@
 from openai import OpenAI
 from dotenv import load_dotenv
+import hashlib
 import os
 
 load_dotenv()
@@ -154,16 +155,50 @@ DOC_TEMPLATE = (
 {insert_plant_design_text_here}
 [DOCUMENT_END]"""
 )
+PARAMETER_TEMPLATE = (
+    """Pre-extracted numeric parameters (file | page | table | parameter | value | unit).
+Use these for Section 5 and cite the file, page and table given; only consult the document text for items missing here.
+[PARAMETERS_START]
+{insert_parameter_list_here}
+[PARAMETERS_END]"""
+)
+REFERENCE_TEMPLATE = (
+    """Pre-indexed codes, standards and reference documents cited (designation | file (pages)).
+Use these for Section 2 with the file and page given as the source label.
+[REFERENCES_START]
+{insert_reference_list_here}
+[REFERENCES_END]"""
+)
 
-def process_with_openai(text: str, user_input: str) -> str:
+# Changes whenever any prompt text changes; part of every report's identity
+PROMPT_VERSION = hashlib.sha256(
+    "\n".join((INSTRUCTIONS, DOC_TEMPLATE, PARAMETER_TEMPLATE, REFERENCE_TEMPLATE)).encode("utf-8")
+).hexdigest()[:12]
+
+def process_with_openai(
+    text: str,
+    user_input: str,
+    parameters: str = "",
+    references: str = ""
+) -> str:
     instructions_filled = INSTRUCTIONS.replace("{user_input}", user_input)
     document = DOC_TEMPLATE.replace("{insert_plant_design_text_here}", text)
 
     convo = [
         {"role": "system", "content": instructions_filled},
         {"role": "user", "content": document},
-        {"role": "user", "content": user_input},
     ]
+    if parameters:
+        convo.append({
+            "role": "user",
+            "content": PARAMETER_TEMPLATE.replace("{insert_parameter_list_here}", parameters),
+        })
+    if references:
+        convo.append({
+            "role": "user",
+            "content": REFERENCE_TEMPLATE.replace("{insert_reference_list_here}", references),
+        })
+    convo.append({"role": "user", "content": user_input})
 
     response = client.responses.create(
         model=MODEL,
@@ -13,6 +13,7 @@ from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from datetime import datetime
 import re
+from services.format_service import classify_rendered_line
 
 
 class HeaderFooterCanvas(canvas.Canvas):
@@ -80,10 +81,20 @@ class HeaderFooterCanvas(canvas.Canvas):
         self.restoreState()
 
 
-def create_styled_document(text_content: str, pdf_file: str):
+def create_styled_document(
+    text_content: str,
+    pdf_file: str,
+    lines: list = None,
+    title: str = "Engineering Specification Report"
+):
     """
     Convert CLEAN text content to a styled, professional PDF.
     No decorative separators - clean and professional.
+
+    ``lines`` are ``(kind, text)`` pairs from
+    ``services.format_service.format_report_lines``; when given they are
+    rendered as classified and ``text_content`` is not re-parsed.
+    ``title`` is used for the title page and the PDF metadata.
     """
 
     doc = SimpleDocTemplate(
@@ -93,7 +104,7 @@ def create_styled_document(text_content: str, pdf_file: str):
         rightMargin=60,
         topMargin=90,
         bottomMargin=70,
-        title="Engineering Specification Report",
+        title=title,
     )
 
     styles = getSampleStyleSheet()
@@ -219,7 +230,7 @@ def create_styled_document(text_content: str, pdf_file: str):
 
     # ===== TITLE PAGE =====
     story.append(Spacer(1, 60))
-    story.append(Paragraph("Engineering Specification Report", title_style))
+    story.append(Paragraph(title, title_style))
     story.append(Spacer(1, 8))
     story.append(Paragraph("Plant Design Document Analysis", subtitle_style))
     story.append(Spacer(1, 20))
@@ -234,56 +245,36 @@ def create_styled_document(text_content: str, pdf_file: str):
     story.append(PageBreak())
 
     # ===== PROCESS CONTENT (plain text) =====
-    lines = text_content.split("\n")
-
-    section_keywords = [
-        "purpose and scope",
-        "applicable codes",
-        "design and performance",
-        "material and component",
-        "material and component specifications",
-        "loads, allowables",
-        "loads and allowables",
-        "execution, testing",
-        "execution requirements",
-        "client inputs",
-        "client requirements",
-    ]
-
-    for raw_line in lines:
-        line = raw_line.strip()
-        if not line:
-            story.append(Spacer(1, 4))
-            continue
+    if lines is None:
+        lines = [classify_rendered_line(line) for line in text_content.split("\n")]
 
-        lower = line.lower()
+    for kind, line in lines:
+        if kind == "blank":
+            story.append(Spacer(1, 4))
 
         # Section header (NO decorative dashes)
-        if any(lower.startswith(kw) or kw in lower[:40] for kw in section_keywords):
+        elif kind == "section":
             story.append(Spacer(1, 8))
             story.append(Paragraph(line, section_header_style))
             story.append(Spacer(1, 6))
 
         # Our artificial subsection tag from formatter
-        elif line.startswith("[SUBSECTION] "):
-            clean = line.replace("[SUBSECTION]", "").strip()
-            story.append(Paragraph(clean, subsection_style))
+        elif kind == "subsection":
+            story.append(Paragraph(line, subsection_style))
             story.append(Spacer(1, 4))
 
         # Bullets
-        elif line.startswith("•") or line.startswith("  •"):
-            clean_line = line.lstrip(" •").strip()
-            story.append(Paragraph(f"• {clean_line}", bullet_style))
+        elif kind == "bullet":
+            story.append(Paragraph(f"• {line}", bullet_style))
             story.append(Spacer(1, 2))
 
         # Marked sources
-        elif line.startswith("[SOURCE] ") or line.strip().startswith("    [SOURCE]"):
-            clean = line.replace("[SOURCE]", "").strip()
-            story.append(Paragraph(clean, source_style))
+        elif kind == "source":
+            story.append(Paragraph(line, source_style))
             story.append(Spacer(1, 2))
 
         # "END OF ..." - clean, NO decorative nnnnn or dashes
-        elif line.startswith("END OF"):
+        elif kind == "end":
             story.append(Spacer(1, 20))
             story.append(Paragraph(line, end_marker_style))
 
@@ -309,10 +300,13 @@ def convert_txt_to_pdf(input_file, output_file):
         raise
 
 
-def text_to_pdf(text_content: str, pdf_file: str):
-    """Convert raw text content directly to a beautifully formatted PDF report."""
+def text_to_pdf(text_content: str, pdf_file: str, lines: list = None):
+    """
+    Convert raw text content directly to a beautifully formatted PDF report.
+    Pass the formatter's classified ``lines`` to skip re-classification.
+    """
     try:
-        create_styled_document(text_content, pdf_file)
+        create_styled_document(text_content, pdf_file, lines)
     except Exception as e:
         print(f"Error in text_to_pdf: {str(e)}")
         raise
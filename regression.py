@@ -0,0 +1,236 @@
+"""
+Quality-versus-speed regression harness for extraction and analysis.
+
+    python regression.py                        # every extraction profile
+    python regression.py --profiles fast-text tables --analyze
+    python regression.py --record-goldens       # goldens for uploads/ PDFs
+
+Each configuration (an extraction profile, optionally followed by the
+OpenAI analysis) is run over the sample specs and timed with the page cache
+bypassed. Its output is scored by recall of the key items in the goldens:
+numeric parameters (quantity and normalised value), cited codes, standards
+and document numbers, and section/table citations. Goldens are the saved
+extractions and analyses in Drafts/ plus, for the PDFs in uploads/,
+extractions recorded with the "full" profile.
+
+The report marks the Pareto frontier (no other configuration is both
+faster and at least as complete) and which configurations stay within
+``--tolerance`` of the best recall, i.e. are safe to turn on.
+"""
+import argparse
+import json
+import logging
+import re
+import time
+from pathlib import Path
+
+from services.pdf_service import EXTRACTION_PROFILES, extract_text_from_pdf, analyze_text
+from services.parameter_service import extract_parameters, format_parameter_summary
+from services.reference_service import ReferenceIndex, find_references
+from services.markdown_service import split_sections
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REGRESSION_DIR = Path("processed") / "regression"
+GOLDEN_DIR = REGRESSION_DIR / "goldens"
+GOLDEN_PROFILE = "full"
+DEFAULT_FOCUS = "Nozzle Load Analysis"
+
+# Sample specs with hand-kept goldens. Analyses of "no requirements found"
+# (e.g. Drafts/New_First_Draft_6.txt) carry no key items and are left out.
+CORPUS = [
+    {
+        "pdf": "Drafts/5.1.3.3_Spcs_Mech10080-1-SS-ME-004 Atmospheric Pressure Storage Tanks 1.pdf",
+        "extraction": "Drafts/text1.txt",
+        "analyses": [
+            "Drafts/First_Draft.txt",
+            "Drafts/New_First_Draft_2.txt",
+            "Drafts/New_First_Draft_3.txt",
+            "Drafts/New_First_Draft_4.txt",
+            "Drafts/output_1.txt",
+        ],
+    },
+    {
+        "pdf": "Drafts/10080-1-DBD-GE-001 Basic Engineering Design Data Rev 2.pdf",
+        "extraction": "Drafts/reliance.txt",
+        "analyses": [
+            "Drafts/New_First_Draft_5.txt",
+            "Drafts/New_First_Draft_7.txt",
+        ],
+    },
+    {
+        "pdf": "Drafts/Quote 2301117G KOM.pdf",
+        "extraction": "Drafts/text3.txt",
+        "analyses": [],
+    },
+]
+
+CITATION_RE = re.compile(
+    r"\b(?P<kind>Section|Clause|Table|Annexure|Annex|Appendix)\s+(?P<number>[A-Z]?\d+(?:\.\d+)*)",
+    re.IGNORECASE,
+)
+
+
+def upload_cases(upload_dir: Path = Path("uploads")) -> list[dict]:
+    """Cases for PDFs in ``upload_dir`` whose golden extraction was recorded."""
+    cases = []
+    for pdf in sorted(upload_dir.glob("*.pdf")):
+        golden = GOLDEN_DIR / f"{pdf.stem}.md"
+        if golden.exists():
+            cases.append({"pdf": str(pdf), "extraction": str(golden), "analyses": []})
+    return cases
+
+
+def key_items(text: str, analysis: bool = False) -> dict[str, set]:
+    """Parameters, references and citations an output must keep."""
+    parameters = extract_parameters(text)
+    items = {
+        "parameters": {
+            (quantity or unit, round(si_value, 3))
+            for quantity, unit, si_value in zip(parameters.quantity, parameters.si_unit, parameters.si_value)
+        },
+        "references": {designation for _, designation, _ in find_references(text)},
+    }
+    if analysis:
+        items["citations"] = {
+            f"{m.group('kind').capitalize()} {m.group('number')}" for m in CITATION_RE.finditer(text)
+        }
+    else:
+        items["citations"] = {
+            label.split(" #")[0] for label, _ in split_sections(text) if label.startswith("Section ")
+        }
+    return items
+
+
+def recall(golden: dict[str, set], candidate: dict[str, set]) -> dict[str, float]:
+    """Fraction of each golden item set found in ``candidate`` (``None`` if empty)."""
+    return {
+        kind: round(len(expected & candidate[kind]) / len(expected), 4) if expected else None
+        for kind, expected in golden.items()
+    }
+
+
+def mean(values) -> float:
+    values = [v for v in values if v is not None]
+    return round(sum(values) / len(values), 4) if values else None
+
+
+def pareto(results: list[dict], tolerance: float) -> list[dict]:
+    """Mark the speed/recall frontier and the configurations safe to enable."""
+    scored = [r for r in results if r["recall"] is not None]
+    best = max((r["recall"] for r in scored), default=None)
+    for r in results:
+        r["pareto"] = r in scored and not any(
+            o["seconds"] <= r["seconds"] and o["recall"] >= r["recall"]
+            and (o["seconds"] < r["seconds"] or o["recall"] > r["recall"])
+            for o in scored
+        )
+        r["safe"] = best is not None and r["recall"] is not None and r["recall"] >= best - tolerance
+    return sorted(results, key=lambda r: r["seconds"])
+
+
+def run_configuration(profile: str, cases: list[dict], analyze: bool, focus: str) -> dict:
+    """Extract (and optionally analyse) every case with ``profile``; time and score it."""
+    extract_seconds = analyze_seconds = 0.0
+    per_case = []
+    for case in cases:
+        pdf = Path(case["pdf"])
+        started = time.perf_counter()
+        text = extract_text_from_pdf(str(pdf), profile=profile, use_cache=False)
+        extract_seconds += time.perf_counter() - started
+
+        golden_text = Path(case["extraction"]).read_text(encoding="utf-8")
+        scores = {"extraction": recall(key_items(golden_text), key_items(text))}
+
+        if analyze and case["analyses"]:
+            references = ReferenceIndex()
+            references.add_document(pdf.name, text)
+            started = time.perf_counter()
+            analysis = analyze_text(
+                f"\n\n--- File: {pdf.name} ---\n{text}",
+                user_input=focus,
+                parameter_summary=format_parameter_summary(extract_parameters(text, pdf.name)),
+                reference_summary=references.summary_for([pdf.name]),
+            )
+            analyze_seconds += time.perf_counter() - started
+            produced = key_items(analysis, analysis=True)
+            per_golden = [
+                recall(key_items(Path(golden).read_text(encoding="utf-8"), analysis=True), produced)
+                for golden in case["analyses"]
+            ]
+            scores["analysis"] = {
+                kind: mean(r[kind] for r in per_golden) for kind in per_golden[0]
+            }
+
+        per_case.append({"pdf": pdf.name, **scores})
+        logger.info(f"{profile}: {pdf.name} {scores}")
+
+    overall = mean(
+        value
+        for case in per_case
+        for stage in ("extraction", "analysis") if stage in case
+        for value in case[stage].values()
+    )
+    return {
+        "profile": profile,
+        "analyzed": analyze,
+        "seconds": round(extract_seconds + analyze_seconds, 2),
+        "extract_seconds": round(extract_seconds, 2),
+        "analyze_seconds": round(analyze_seconds, 2),
+        "recall": overall,
+        "cases": per_case,
+    }
+
+
+def record_goldens(upload_dir: Path) -> None:
+    """Save ``GOLDEN_PROFILE`` extractions of the PDFs in ``upload_dir``."""
+    GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+    for pdf in sorted(upload_dir.glob("*.pdf")):
+        text = extract_text_from_pdf(str(pdf), profile=GOLDEN_PROFILE, use_cache=False)
+        (GOLDEN_DIR / f"{pdf.stem}.md").write_text(text, encoding="utf-8")
+        logger.info(f"Recorded golden for {pdf.name} ({len(text)} characters)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score extraction/analysis configurations for speed and recall")
+    parser.add_argument("--profiles", nargs="+", default=list(EXTRACTION_PROFILES), choices=list(EXTRACTION_PROFILES))
+    parser.add_argument("--analyze", action="store_true", help="Also run the OpenAI analysis and score it")
+    parser.add_argument("--focus", default=DEFAULT_FOCUS, help="Focus area the golden analyses were written for")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Recall drop still considered safe")
+    parser.add_argument("--uploads", default="uploads", help="Directory of extra sample specs")
+    parser.add_argument("--record-goldens", action="store_true", help=f"Record '{GOLDEN_PROFILE}' goldens for --uploads and exit")
+    parser.add_argument("--output", default=str(REGRESSION_DIR / "report.json"))
+    args = parser.parse_args()
+
+    if args.record_goldens:
+        record_goldens(Path(args.uploads))
+        return
+
+    cases = [c for c in CORPUS if Path(c["pdf"]).exists()] + upload_cases(Path(args.uploads))
+    if not cases:
+        parser.error("No regression cases found")
+
+    # Load the Marker models once so the first configuration isn't penalised
+    extract_text_from_pdf(cases[0]["pdf"], page_range=[0], profile=args.profiles[0], use_cache=False)
+
+    results = pareto(
+        [run_configuration(profile, cases, args.analyze, args.focus) for profile in args.profiles],
+        args.tolerance,
+    )
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({"cases": [c["pdf"] for c in cases], "results": results}, indent=2), encoding="utf-8")
+
+    print("\n" + "=" * 50)
+    print(f"{'profile':<12}{'seconds':>10}{'recall':>9}  pareto  safe")
+    for r in results:
+        recall_text = "-" if r["recall"] is None else f"{r['recall']:.3f}"
+        print(f"{r['profile']:<12}{r['seconds']:>10.1f}{recall_text:>9}  {'yes' if r['pareto'] else 'no':<6}  {'yes' if r['safe'] else 'no'}")
+    print(f"Report written to {output}")
+    print("=" * 50 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Admission control and backpressure for upload processing.
+
+Every upload is given a cost from its page count and size. Jobs run while
+their total cost fits the configured capacity; the rest wait in a bounded
+queue that is served round-robin across clients, so one client sending a
+burst of packages can't starve the others. When the queue is full, a
+client has too many jobs in flight, or a queued job waits too long, the
+request is rejected straight away with a Retry-After hint instead of
+piling more Marker model sets and prompts into memory.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+# One cost unit per page plus one per MB uploaded
+COST_PER_PAGE = 1.0
+COST_PER_MB = 1.0
+
+
+class Overloaded(Exception):
+    """Raised when a job can't be admitted; carries the HTTP response to send."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def estimate_cost(page_count: int, size_bytes: int) -> float:
+    """Relative cost of processing a package of ``page_count`` pages."""
+    return max(1.0, page_count * COST_PER_PAGE + size_bytes / 1024**2 * COST_PER_MB)
+
+
+class AdmissionController:
+    """Cost-bounded concurrency with a fair, bounded wait queue."""
+
+    def __init__(
+        self,
+        capacity: float = None,
+        max_queue: int = None,
+        max_per_client: int = None,
+        queue_timeout: float = None,
+    ):
+        self.capacity = capacity or float(os.getenv("ADMISSION_CAPACITY", "300"))
+        self.max_queue = max_queue or int(os.getenv("ADMISSION_MAX_QUEUE", "8"))
+        self.max_per_client = max_per_client or int(os.getenv("ADMISSION_MAX_PER_CLIENT", "2"))
+        self.queue_timeout = queue_timeout or float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "300"))
+
+        self.active_cost = 0.0
+        self.active_jobs = 0
+        self.per_client: dict[str, int] = {}
+        self.queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.rejected = 0
+        self.wait_times: deque = deque(maxlen=200)
+        self.job_times: deque = deque(maxlen=50)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def _fits(self, cost: float) -> bool:
+        # An idle controller always admits so oversized packages still run
+        return self.active_jobs == 0 or self.active_cost + cost <= self.capacity
+
+    def _retry_after(self) -> int:
+        average = sum(self.job_times) / len(self.job_times) if self.job_times else 60.0
+        slots = max(self.active_jobs, 1)
+        return max(1, int(average * (self.queue_depth + 1) / slots))
+
+    def _start(self, cost: float) -> None:
+        self.active_cost += cost
+        self.active_jobs += 1
+
+    def _dispatch(self) -> None:
+        """Start queued jobs round-robin across clients while they fit."""
+        while self.queues:
+            client, queue = next(iter(self.queues.items()))
+            future, cost, _ = queue[0]
+            if future.done():  # abandoned while waiting
+                queue.popleft()
+            elif self._fits(cost):
+                queue.popleft()
+                self._start(cost)
+                future.set_result(None)
+            else:
+                break
+            if queue:
+                self.queues.move_to_end(client)
+            else:
+                del self.queues[client]
+
+    def _drop_waiter(self, client: str, future) -> None:
+        queue = self.queues.get(client)
+        if queue is None:
+            return
+        for entry in list(queue):
+            if entry[0] is future:
+                queue.remove(entry)
+        if not queue:
+            del self.queues[client]
+
+    def _reject(self, status_code: int, detail: str) -> None:
+        self.rejected += 1
+        raise Overloaded(status_code, detail, self._retry_after())
+
+    def check_client(self, client: str) -> None:
+        """
+        Raise ``Overloaded`` (429) if ``client`` already has its maximum of
+        jobs in flight. Cheap, so callers can reject before costing a job.
+        """
+        if self.per_client.get(client, 0) >= self.max_per_client:
+            self._reject(429, f"Too many concurrent jobs for this client (limit {self.max_per_client})")
+
+    @asynccontextmanager
+    async def admit(self, client: str, cost: float):
+        """
+        Wait for capacity to run a job of ``cost`` for ``client``.
+        Raises ``Overloaded`` (429 per-client limit, 503 saturated) instead
+        of queueing without bound.
+        """
+        self.check_client(client)
+
+        self.per_client[client] = self.per_client.get(client, 0) + 1
+        enqueued = time.monotonic()
+        try:
+            if not self.queues and self._fits(cost):
+                self._start(cost)
+            else:
+                if self.queue_depth >= self.max_queue:
+                    self._reject(503, "Server is at capacity, please retry later")
+                future = asyncio.get_running_loop().create_future()
+                self.queues.setdefault(client, deque()).append((future, cost, enqueued))
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+                except BaseException as exc:
+                    if future.done() and not future.cancelled():
+                        self._finish(cost)  # started just as we gave up
+                    else:
+                        future.cancel()
+                        self._drop_waiter(client, future)
+                    self._dispatch()
+                    if isinstance(exc, asyncio.TimeoutError):
+                        self._reject(503, "Timed out waiting for processing capacity")
+                    raise
+
+            self.wait_times.append(time.monotonic() - enqueued)
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                self.job_times.append(time.monotonic() - started)
+                self._finish(cost)
+                self._dispatch()
+        finally:
+            self.per_client[client] -= 1
+            if not self.per_client[client]:
+                del self.per_client[client]
+
+    def _finish(self, cost: float) -> None:
+        self.active_cost -= cost
+        self.active_jobs -= 1
+
+    def stats(self) -> dict:
+        waits = sorted(self.wait_times)
+        return {
+            "capacity": self.capacity,
+            "active_jobs": self.active_jobs,
+            "active_cost": round(self.active_cost, 1),
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "clients_queued": len(self.queues),
+            "rejected": self.rejected,
+            "wait_seconds_mean": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_seconds_p95": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+            "retry_after_estimate": self._retry_after(),
+        }
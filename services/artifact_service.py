@@ -0,0 +1,148 @@
+"""
+Compressed, memory-mapped store for extracted document text.
+
+Each extraction is written once as ``<id>.mdz``: one zlib block per page,
+laid end to end, plus a small ``<id>.json`` index of page and section
+offsets. Reading maps the file and decompresses only the blocks a page or
+section slice needs, so nothing else is copied into memory.
+"""
+import json
+import mmap
+import threading
+import zlib
+from pathlib import Path
+from services.markdown_service import page_index, split_sections
+
+COMPRESSION_LEVEL = 6
+
+
+class DocumentArtifact:
+    """Read-only view of one stored extraction."""
+
+    def __init__(self, data_path: Path, index: dict):
+        self.data_path = data_path
+        self.index = index
+        self._mm = None
+        self._lock = threading.Lock()
+
+    def _map(self):
+        with self._lock:
+            if self._mm is None:
+                with open(self.data_path, "rb") as fh:
+                    self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._mm
+
+    def _block(self, block_no: int) -> str:
+        _, _, offset, length = self.index["pages"][block_no]
+        view = memoryview(self._map())[offset:offset + length]
+        try:
+            return zlib.decompress(view).decode("utf-8")
+        finally:
+            view.release()
+
+    @property
+    def page_numbers(self) -> list[int]:
+        return sorted({page for page, _, _, _ in self.index["pages"]})
+
+    @property
+    def section_labels(self) -> list[str]:
+        return [label for label, _, _ in self.index["sections"]]
+
+    def __len__(self):
+        return self.index["length"]
+
+    def page(self, page: int) -> str:
+        """Markdown of one page (1-based, as in the page separators)."""
+        blocks = [
+            block_no for block_no, (number, _, _, _) in enumerate(self.index["pages"])
+            if number == page
+        ]
+        if not blocks:
+            raise KeyError(f"Page {page} not in artifact")
+        return "".join(self._block(block_no) for block_no in blocks)
+
+    def slice(self, start: int, end: int) -> str:
+        """Characters ``start:end`` of the full text, touching only the needed pages."""
+        pages = self.index["pages"]
+        parts = []
+        for block_no, (_, char_start, _, _) in enumerate(pages):
+            char_end = pages[block_no + 1][1] if block_no + 1 < len(pages) else self.index["length"]
+            if char_end <= start or char_start >= end:
+                continue
+            block = self._block(block_no)
+            parts.append(block[max(start - char_start, 0):end - char_start])
+        return "".join(parts)
+
+    def section(self, label: str) -> str:
+        for name, start, end in self.index["sections"]:
+            if name == label:
+                return self.slice(start, end)
+        raise KeyError(f"Section {label!r} not in artifact")
+
+    def text(self) -> str:
+        return "".join(self._block(i) for i in range(len(self.index["pages"])))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+
+
+class ArtifactStore:
+    """Directory of ``DocumentArtifact`` files keyed by content id."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, artifact_id: str) -> tuple[Path, Path]:
+        return (
+            self.directory / f"{artifact_id}.mdz",
+            self.directory / f"{artifact_id}.json",
+        )
+
+    def write(self, artifact_id: str, text: str) -> DocumentArtifact:
+        """Store ``text`` under ``artifact_id`` unless it is already stored."""
+        existing = self.open(artifact_id)
+        if existing is not None:
+            return existing
+
+        data_path, index_path = self._paths(artifact_id)
+        offsets, pages = page_index(text)
+        boundaries = offsets[1:] + [len(text)]
+
+        block_index = []
+        position = 0
+        suffix = f".{threading.get_ident()}.tmp"
+        data_tmp = data_path.with_name(data_path.name + suffix)
+        index_tmp = index_path.with_name(index_path.name + suffix)
+        with open(data_tmp, "wb") as fh:
+            for page, char_start, char_end in zip(pages, offsets, boundaries):
+                block = zlib.compress(text[char_start:char_end].encode("utf-8"), COMPRESSION_LEVEL)
+                fh.write(block)
+                block_index.append([page, char_start, position, len(block)])
+                position += len(block)
+
+        sections = []
+        char_start = 0
+        for label, body in split_sections(text):
+            sections.append([label, char_start, char_start + len(body)])
+            char_start += len(body)
+
+        index = {"length": len(text), "pages": block_index, "sections": sections}
+        with open(index_tmp, "w", encoding="utf-8") as fh:
+            json.dump(index, fh)
+
+        # Data first, index last: an index on disk means the artifact is complete
+        data_tmp.replace(data_path)
+        index_tmp.replace(index_path)
+        return DocumentArtifact(data_path, index)
+
+    def open(self, artifact_id: str) -> DocumentArtifact:
+        """Return the stored artifact or ``None``."""
+        data_path, index_path = self._paths(artifact_id)
+        if not index_path.exists():
+            return None
+        with open(index_path, "r", encoding="utf-8") as fh:
+            return DocumentArtifact(data_path, json.load(fh))
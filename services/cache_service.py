@@ -0,0 +1,61 @@
+"""
+Page-level cache of Marker output.
+
+Documents in a package often share identical pages (revision records,
+cover sheets, standard notes). Each page's markdown is stored under the
+fingerprint of the source page, so a page is only OCR'd the first time it
+is seen in any document.
+"""
+import re
+import threading
+from pathlib import Path
+
+# Marker names images after the page index; store them position-independent
+PAGE_REF_RE = re.compile(r"_page_\d+_")
+PAGE_REF_PLACEHOLDER = "_page_{PAGE}_"
+
+
+class PageCache:
+    """Fingerprint -> page markdown, one file per page, with hit statistics."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, fingerprint: str, namespace: str) -> Path:
+        return self.directory / namespace / fingerprint[:2] / f"{fingerprint}.md"
+
+    def get(self, fingerprint: str, page_index: int, namespace: str = "default") -> str:
+        """
+        Return cached markdown for the page at ``page_index``, or ``None``.
+        ``namespace`` separates output produced with different settings.
+        """
+        path = self._path(fingerprint, namespace)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text.replace(PAGE_REF_PLACEHOLDER, f"_page_{page_index}_")
+
+    def put(self, fingerprint: str, text: str, namespace: str = "default") -> None:
+        path = self._path(fingerprint, namespace)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_text(PAGE_REF_RE.sub(PAGE_REF_PLACEHOLDER, text), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,219 @@
+"""
+Deterministic resolver for the "(From ...)" source labels in LLM output.
+
+An outline of every extracted document is built from Marker markdown
+headings, numbered paragraphs, pipe tables and page breaks. Each bullet of
+the analysis is matched back to the outline span that shares the most
+distinctive words and numbers with it. Missing labels are filled in from
+that span; a model label is only replaced when the span it names matches
+clearly worse, so a close call never turns a right label wrong.
+"""
+import math
+import re
+from collections import defaultdict
+from services.markdown_service import (
+    HEADING_RE,
+    page_index,
+    page_at,
+    iter_tables,
+    section_label,
+)
+
+FILE_HEADER_RE = re.compile(r"^--- File: (?P<name>.+?) ---\s*$", re.MULTILINE)
+SOURCE_LABEL_RE = re.compile(r"\s*\(From\b[^()]*(?:\([^()]*\)[^()]*)*\)\s*\.?\s*$", re.IGNORECASE)
+BULLET_RE = re.compile(r"^(?P<indent>\s*)(?P<mark>[-*•])\s+(?P<body>.+)$")
+TOKEN_RE = re.compile(r"[a-z][a-z0-9]{2,}|\d+(?:\.\d+)?")
+
+STOPWORDS = frozenset(
+    "the and for with shall from that this are not any all per be of to in on by as or "
+    "which when where than have has been will each such other into section table page "
+    "file none found explicitly provided documents".split()
+)
+
+# Spans sharing fewer distinctive tokens than this are not trusted
+MIN_MATCHED_TOKENS = 2
+# A label is only replaced when the best span outscores the span it names
+# by this factor; labels naming no span in the outline are left alone
+CORRECTION_MARGIN = 1.5
+
+
+def _tokens(text: str) -> set[str]:
+    return {t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS}
+
+
+def split_files(combined_text: str) -> list[tuple[str, str]]:
+    """Split combined upload text on ``--- File: name ---`` headers."""
+    headers = list(FILE_HEADER_RE.finditer(combined_text))
+    if not headers:
+        return [("", combined_text)]
+    files = []
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(combined_text)
+        files.append((header.group("name"), combined_text[header.end():end]))
+    return files
+
+
+class DocumentOutline:
+    """Section/table/page spans of one or more documents with a token index."""
+
+    def __init__(self):
+        self.spans: list[dict] = []
+        self.postings: dict[str, list[int]] = defaultdict(list)
+
+    @classmethod
+    def from_text(cls, combined_text: str) -> "DocumentOutline":
+        outline = cls()
+        for file_name, text in split_files(combined_text):
+            outline.add_document(file_name, text)
+        return outline
+
+    def add_document(self, file_name: str, text: str) -> None:
+        offsets, pages = page_index(text)
+
+        # Boundaries: every heading, every page break and every table edge
+        headings = [(m.start(), m.group("heading") or m.group(0)) for m in HEADING_RE.finditer(text)]
+        tables = [(start, end, caption) for _, caption, start, end, _, _ in iter_tables(text)]
+        cuts = sorted(
+            {0, len(text)}
+            | {pos for pos, _ in headings}
+            | set(offsets)
+            | {pos for start, end, _ in tables for pos in (start, end)}
+        )
+
+        heading_no = 0
+        table_no = 0
+        section = ""
+        for start, end in zip(cuts, cuts[1:]):
+            while heading_no < len(headings) and headings[heading_no][0] <= start:
+                section = section_label(headings[heading_no][1])
+                heading_no += 1
+            while table_no < len(tables) and tables[table_no][1] <= start:
+                table_no += 1
+            table = None
+            if table_no < len(tables) and tables[table_no][0] <= start:
+                table = tables[table_no][2]
+
+            body = text[start:end]
+            tokens = _tokens(body)
+            if not tokens:
+                continue
+            span_id = len(self.spans)
+            self.spans.append({
+                "file": file_name,
+                "page": page_at(offsets, pages, start),
+                "section": section,
+                "table": table,
+                "text": body,
+            })
+            for token in tokens:
+                self.postings[token].append(span_id)
+
+    def label(self, span_id: int) -> str:
+        span = self.spans[span_id]
+        parts = []
+        if span["file"]:
+            parts.append(f'"{span["file"]}"')
+        if span["table"]:
+            parts.append(span["table"])
+        elif span["section"]:
+            parts.append(span["section"])
+        parts.append(f"Page {span['page']}")
+        return f"(From {', '.join(parts)})"
+
+    def scores(self, text: str) -> tuple[dict[int, float], dict[int, int]]:
+        """IDF-weighted score and matched-token count of every span sharing a token with ``text``."""
+        total = len(self.spans) or 1
+        scores: dict[int, float] = defaultdict(float)
+        matched: dict[int, int] = defaultdict(int)
+        for token in _tokens(text):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for span_id in set(postings):
+                scores[span_id] += idf
+                matched[span_id] += 1
+        return scores, matched
+
+    def rank(self, text: str, limit: int = 3) -> list[tuple[int, float, int]]:
+        """Return up to ``limit`` ``(span_id, score, matched_tokens)`` for ``text``."""
+        scores, matched = self.scores(text)
+        best = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [(span_id, scores[span_id], matched[span_id]) for span_id in best]
+
+
+def _claims_span(claimed: str, span: dict) -> bool:
+    """True when a lowercased label names the section or table of ``span``."""
+    section_no = span["section"].replace("Section ", "").lower()
+    # "11" must not match "11.6", "1.1" must not match "11.1" and page or
+    # table numbers are not section numbers
+    if section_no and re.search(
+        rf"(?<![\w.])(?<!page )(?<!table ){re.escape(section_no)}(?!\.?\d)", claimed
+    ):
+        return True
+    return bool(span["table"]) and span["table"].lower() in claimed
+
+
+def claimed_score(claimed: str, outline: DocumentOutline, scores: dict[int, float]) -> float:
+    """
+    Best score among the spans a label points at; ``None`` when the label
+    names no span of the outline at all (e.g. "(From Page 2)").
+    """
+    claimed = claimed.lower()
+    named = [span_id for span_id, span in enumerate(outline.spans) if _claims_span(claimed, span)]
+    if not named:
+        return None
+    return max(scores.get(span_id, 0.0) for span_id in named)
+
+
+def resolve_citations(analysis: str, combined_text: str) -> tuple[str, dict]:
+    """
+    Fill in missing "(From ...)" labels and replace ones whose span matches
+    the bullet clearly worse than the best outline span. Labels that can't
+    be confirmed or clearly beaten are kept and counted as unresolved.
+    Returns ``(text, stats)``.
+    """
+    stats = {"bullets": 0, "filled": 0, "verified": 0, "corrected": 0, "unresolved": 0}
+    if not analysis or not combined_text:
+        return analysis, stats
+
+    outline = DocumentOutline.from_text(combined_text)
+    resolved_lines = []
+    for line in analysis.split("\n"):
+        bullet = BULLET_RE.match(line)
+        if not bullet or "none found" in line.lower():
+            resolved_lines.append(line)
+            continue
+
+        stats["bullets"] += 1
+        body = bullet.group("body")
+        existing = SOURCE_LABEL_RE.search(body)
+        claim = body[:existing.start()] if existing else body
+
+        scores, matched = outline.scores(claim)
+        ranked = sorted(scores, key=scores.get, reverse=True)[:3]
+        if not ranked or matched[ranked[0]] < MIN_MATCHED_TOKENS:
+            stats["unresolved"] += 1
+            resolved_lines.append(line)
+            continue
+
+        if existing:
+            claimed = existing.group(0).lower()
+            if any(_claims_span(claimed, outline.spans[span_id]) for span_id in ranked):
+                stats["verified"] += 1
+                resolved_lines.append(line)
+                continue
+            # Only overrule the model when the claimed span is clearly worse
+            own_score = claimed_score(claimed, outline, scores)
+            if own_score is None or scores[ranked[0]] < own_score * CORRECTION_MARGIN:
+                stats["unresolved"] += 1
+                resolved_lines.append(line)
+                continue
+
+        stats["corrected" if existing else "filled"] += 1
+        resolved_lines.append(
+            f"{bullet.group('indent')}{bullet.group('mark')} "
+            f"{claim.rstrip(' .')} {outline.label(ranked[0])}"
+        )
+
+    return "\n".join(resolved_lines), stats
@@ -1,5 +1,6 @@
 import os
 import shutil
+import hashlib
 from pathlib import Path
 from typing import Optional
 
@@ -58,4 +59,21 @@ def get_unique_filename(filepath: str) -> str:
         new_path = f"{base}_v{version}{ext}"
         if not os.path.exists(new_path):
             return new_path
-        version += 1
\ No newline at end of file
+        version += 1
+
+def file_digest(filepath: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file's contents.
+    
+    Args:
+        filepath: Path of the file to hash
+        chunk_size: Bytes read per iteration
+        
+    Returns:
+        str: Hex digest identifying the file content
+    """
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
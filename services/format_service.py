@@ -0,0 +1,133 @@
+"""
+Single-pass formatting of OpenAI analyses into classified report lines.
+
+The analysis is cleaned with one precompiled substitution and every line is
+classified exactly once against precompiled keyword alternations. The
+result is a list of ``(kind, text)`` pairs that the PDF renderer consumes
+directly, so it no longer re-derives the same classification from tags.
+"""
+import re
+from datetime import datetime
+
+# Line kinds understood by pdf_Convertor.create_styled_document
+BLANK = "blank"
+SECTION = "section"
+SUBSECTION = "subsection"
+BULLET = "bullet"
+SOURCE = "source"
+BODY = "body"
+END = "end"
+
+SECTION_KEYWORDS = (
+    "purpose and scope",
+    "applicable codes",
+    "design and performance",
+    "material and component",
+    "loads, allowables",
+    "loads and allowables",
+    "execution, testing",
+    "execution requirements",
+    "client inputs",
+    "client requirements",
+)
+SUBSECTION_KEYWORDS = (
+    "requirements:", "standard:", "standards:",
+    "specification:", "specifications:",
+    "data:", "table", "note:",
+)
+
+
+def _alternation(keywords) -> re.Pattern:
+    # Longest first so overlapping keywords can't shadow each other
+    return re.compile("|".join(re.escape(kw) for kw in sorted(keywords, key=len, reverse=True)))
+
+
+SECTION_RE = _alternation(SECTION_KEYWORDS)
+SUBSECTION_RE = _alternation(SUBSECTION_KEYWORDS)
+
+# LLM HTML / ReportLab markup and the entities and dashes we normalise
+CLEANUP_RE = re.compile("<[^>]*>|&nbsp;|&bull;|[\u2011\u2013\u2014]")
+# Non-breaking hyphen, en dash and em dash all become "-"
+CLEANUP = {"&nbsp;": " ", "&bull;": "•", "\u2011": "-", "\u2013": "-", "\u2014": "-"}
+BULLET_PREFIX_RE = re.compile(r"^[\-\*\•\d\)\.\s]+")
+
+# How each kind is written in the plain-text form of the report
+TEXT_PREFIX = {SUBSECTION: "[SUBSECTION] ", BULLET: "  • ", SOURCE: "    [SOURCE] "}
+
+
+def _clean(match: re.Match) -> str:
+    return CLEANUP.get(match.group(0), "")
+
+
+def clean_text(text: str) -> str:
+    """Strip markup and normalise entities and dashes in one pass."""
+    return CLEANUP_RE.sub(_clean, text)
+
+
+def classify_line(line: str) -> tuple[str, str]:
+    """Classify one stripped, non-empty analysis line; returns ``(kind, text)``."""
+    lower = line.lower()
+    if SECTION_RE.search(lower):
+        return SECTION, line
+    if SUBSECTION_RE.search(lower):
+        return SUBSECTION, line
+    if line.startswith(("•", "-", "*")) or (line[:3].isdigit() and line[3:4] in {".", ")"}):
+        return BULLET, BULLET_PREFIX_RE.sub("", line).strip()
+    if "(from" in lower:
+        return SOURCE, line
+    return BODY, line
+
+
+def format_report_lines(text: str, user_input: str) -> list[tuple[str, str]]:
+    """
+    Turn an OpenAI analysis into ``(kind, text)`` report lines, with the
+    header block and end marker, in a single pass over the text.
+    """
+    if not text:
+        return [(BODY, "No content available.")]
+
+    lines = [
+        (BODY, "ENGINEERING SPECIFICATION ANALYSIS"),
+        (BODY, f"Focus Area: {user_input if user_input else 'Entire Document'}"),
+        (BODY, f"Generated on {datetime.now().strftime('%B %d, %Y')}"),
+        (BLANK, ""),
+    ]
+    for raw_line in clean_text(text).split("\n"):
+        line = raw_line.strip()
+        if not line:
+            continue
+        kind, content = classify_line(line)
+        if kind in (SECTION, SUBSECTION):
+            lines.append((BLANK, ""))
+        lines.append((kind, content))
+
+    lines.append((BLANK, ""))
+    lines.append((END, "END OF ENGINEERING SPECIFICATION ANALYSIS"))
+    return lines
+
+
+def lines_to_text(lines: list[tuple[str, str]]) -> str:
+    """Plain-text form of classified lines, with ``[SUBSECTION]``/``[SOURCE]`` tags."""
+    return "\n".join(TEXT_PREFIX.get(kind, "") + content for kind, content in lines)
+
+
+def classify_rendered_line(line: str) -> tuple[str, str]:
+    """
+    Classify a line of plain formatted text (``lines_to_text`` output or a
+    hand-written draft) for rendering; returns ``(kind, text)``.
+    """
+    line = line.strip()
+    if not line:
+        return BLANK, ""
+    # Section keywords only count within the first 40 characters here
+    if SECTION_RE.search(line.lower(), 0, 40):
+        return SECTION, line
+    if line.startswith("[SUBSECTION] "):
+        return SUBSECTION, line.replace("[SUBSECTION]", "").strip()
+    if line.startswith("•"):
+        return BULLET, line.lstrip(" •").strip()
+    if line.startswith("[SOURCE] "):
+        return SOURCE, line.replace("[SOURCE]", "").strip()
+    if line.startswith("END OF"):
+        return END, line
+    return BODY, line
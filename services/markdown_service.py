@@ -0,0 +1,167 @@
+"""
+Helpers for navigating Marker markdown output.
+
+Marker renders a PDF to a single markdown string. With ``paginate_output``
+enabled every page is preceded by a separator line such as
+``{3}------------------------------------------------``; without it the only
+page hints are image references like ``![](_page_3_Picture_0.jpeg)``.
+These helpers locate pages and pipe tables by character offset so other
+services can tag what they find with a page and table.
+"""
+import re
+from bisect import bisect_right
+
+PAGE_SEPARATOR_RE = re.compile(r"^\{(\d+)\}-{10,}\s*$", re.MULTILINE)
+PAGE_IMAGE_RE = re.compile(r"_page_(\d+)_")
+TABLE_BLOCK_RE = re.compile(r"(?:^[ \t]*\|.*\|[ \t]*(?:\n|$))+", re.MULTILINE)
+TABLE_DIVIDER_RE = re.compile(r"^\|?[\s:\-|]+\|?$")
+TABLE_CAPTION_RE = re.compile(r"\btable\b[^\n]{0,80}", re.IGNORECASE)
+# Numbered paragraphs may come out as list items ("- 11.6 For purpose of
+# ..."); those only count when the text after the number is a capitalised
+# word rather than a unit, so "- 0.1 % (weight)" and "- 3.5 Kg/cm2" stay
+# bullets.
+HEADING_RE = re.compile(
+    r"^(?:#{1,6}[ \t]+(?P<heading>.+)"
+    r"|(?:[-*][ \t]+(?=(?:\*\*)?\d+(?:\.\d+)+\.?(?:\*\*)?[ \t]+(?:\*\*)?"
+    r"[A-Z](?![A-Za-z]*/)(?!(?i:ar|arg|pa|si|sig)\b)))?"
+    r"(?:\*\*)?(?P<number>\d+(?:\.\d+)+)\.?(?:\*\*)?[ \t]+(?P<title>.*))$",
+    re.MULTILINE,
+)
+SECTION_NUMBER_RE = re.compile(r"^(?:[-*]\s+)?(?:\*\*)?(\d+(?:\.\d+)*)\.?(?:\*\*)?\s+")
+MARKUP_RE = re.compile(r"<[^>]+>|\*\*|__|`|#+\s")
+TABLE_PADDING_RE = re.compile(r"[ \t]*\|[ \t]*")
+TABLE_DIVIDER_RUN_RE = re.compile(r"-{3,}")
+PAGE_SEPARATOR = "-" * 48
+
+
+def page_index(text: str) -> tuple[list[int], list[int]]:
+    """
+    Return parallel lists ``(offsets, pages)`` of page start offsets and
+    1-based page numbers, suitable for ``bisect`` lookups.
+    """
+    offsets = [0]
+    pages = [1]
+
+    separators = list(PAGE_SEPARATOR_RE.finditer(text))
+    if separators:
+        for match in separators:
+            offsets.append(match.start())
+            pages.append(int(match.group(1)) + 1)
+        return offsets, pages
+
+    # Fallback: image references tell us which page we are on
+    for match in PAGE_IMAGE_RE.finditer(text):
+        page = int(match.group(1)) + 1
+        if page > pages[-1]:
+            line_start = text.rfind("\n", 0, match.start()) + 1
+            offsets.append(line_start)
+            pages.append(page)
+    return offsets, pages
+
+
+def page_at(offsets: list[int], pages: list[int], position: int) -> int:
+    """Return the page number containing ``position``."""
+    return pages[max(bisect_right(offsets, position) - 1, 0)]
+
+
+def split_pages(text: str) -> dict[int, str]:
+    """Split paginated Marker output into ``{page_number: markdown}``."""
+    separators = list(PAGE_SEPARATOR_RE.finditer(text))
+    if not separators:
+        return {1: text}
+    pages = {}
+    for i, match in enumerate(separators):
+        end = separators[i + 1].start() if i + 1 < len(separators) else len(text)
+        pages[int(match.group(1)) + 1] = text[match.end():end].strip("\n")
+    return pages
+
+
+def join_pages(pages: dict[int, str]) -> str:
+    """Inverse of ``split_pages``: rebuild paginated markdown in page order."""
+    return "".join(
+        f"\n\n{{{page - 1}}}{PAGE_SEPARATOR}\n\n{pages[page]}"
+        for page in sorted(pages)
+    )
+
+
+def section_label(heading: str) -> str:
+    """``Section 9.5.2`` for numbered headings, else the cleaned heading text."""
+    heading = " ".join(MARKUP_RE.sub(" ", heading).split())
+    numbered = SECTION_NUMBER_RE.match(heading)
+    if numbered:
+        return f"Section {numbered.group(1)}"
+    return heading[:60]
+
+
+def split_sections(text: str) -> list[tuple[str, str]]:
+    """
+    Split markdown into ``(label, body)`` pairs at headings and numbered
+    paragraphs. Text before the first heading is labelled ``Preamble``;
+    repeated labels get a ``#n`` suffix so every label is unique.
+    """
+    starts = [(m.start(), section_label(m.group("heading") or m.group(0)))
+              for m in HEADING_RE.finditer(text)]
+    if not starts or starts[0][0] > 0:
+        starts.insert(0, (0, "Preamble"))
+
+    sections = []
+    seen: dict[str, int] = {}
+    for i, (start, label) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        seen[label] = seen.get(label, 0) + 1
+        if seen[label] > 1:
+            label = f"{label} #{seen[label]}"
+        sections.append((label, text[start:end]))
+    return sections
+
+
+def split_cells(row: str) -> list[str]:
+    """Split a pipe-table row into stripped cell strings."""
+    row = row.strip()
+    if row.startswith("|"):
+        row = row[1:]
+    if row.endswith("|"):
+        row = row[:-1]
+    return [cell.strip() for cell in row.split("|")]
+
+
+def compact_tables(text: str) -> str:
+    """
+    Strip the column padding Marker adds to pipe tables (``|  3    | 1000  |``
+    becomes ``|3|1000|``); often half of a table-heavy document's length.
+    """
+    return TABLE_BLOCK_RE.sub(
+        lambda m: TABLE_DIVIDER_RUN_RE.sub("---", TABLE_PADDING_RE.sub("|", m.group(0))), text
+    )
+
+
+def iter_tables(text: str):
+    """
+    Yield ``(table_no, caption, start, end, header, rows)`` for every pipe
+    table in ``text``. ``rows`` is a list of ``(offset, cells)`` tuples.
+    """
+    for table_no, match in enumerate(TABLE_BLOCK_RE.finditer(text), start=1):
+        start, end = match.span()
+
+        # Use the nearest preceding "Table ..." line as caption when present
+        preceding = text[max(0, start - 300):start].strip().split("\n")
+        caption = f"Table {table_no}"
+        for line in reversed(preceding[-3:]):
+            found = TABLE_CAPTION_RE.search(line)
+            if found:
+                caption = found.group(0).strip(" *#")
+                break
+
+        header: list[str] = []
+        rows: list[tuple[int, list[str]]] = []
+        offset = start
+        for line in match.group(0).split("\n"):
+            if line.strip():
+                if TABLE_DIVIDER_RE.match(line.strip()):
+                    if rows and not header:
+                        header = rows.pop()[1]
+                else:
+                    rows.append((offset, split_cells(line)))
+            offset += len(line) + 1
+
+        yield table_no, caption, start, end, header, rows
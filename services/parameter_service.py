@@ -0,0 +1,449 @@
+"""
+Deterministic extraction of numeric engineering parameters from Marker output.
+
+Every value+unit pair (pressures, temperatures, lengths, forces and moments)
+is found with a single compiled regex pass over the document, tagged with the
+file, page and table it came from, and normalised to a canonical unit. Bare
+numbers in table columns whose header names the unit are picked up too. The
+result is kept as a compact columnar table so it can be filtered quickly and
+summarised for the LLM, which gets the table rows it fully covers as that
+short list instead of as raw rows.
+"""
+import re
+from services.markdown_service import page_index, page_at, iter_tables
+
+# unit spelling (lowercase, markup stripped) -> (quantity, canonical unit, factor)
+UNITS = {
+    "barg": ("pressure", "kPa", 100.0),
+    "bar(g)": ("pressure", "kPa", 100.0),
+    "bar": ("pressure", "kPa", 100.0),
+    "mbar": ("pressure", "kPa", 0.1),
+    "millibar": ("pressure", "kPa", 0.1),
+    "kpa": ("pressure", "kPa", 1.0),
+    "kpag": ("pressure", "kPa", 1.0),
+    "kpa(g)": ("pressure", "kPa", 1.0),
+    "mpa": ("pressure", "kPa", 1000.0),
+    "psi": ("pressure", "kPa", 6.894757),
+    "psig": ("pressure", "kPa", 6.894757),
+    "kg/cm2": ("pressure", "kPa", 98.0665),
+    "kg/cm2g": ("pressure", "kPa", 98.0665),
+    "kg/cm2(g)": ("pressure", "kPa", 98.0665),
+    "°c": ("temperature", "°C", 1.0),
+    "degc": ("temperature", "°C", 1.0),
+    "deg c": ("temperature", "°C", 1.0),
+    "°f": ("temperature", "°C", None),
+    "mm": ("length", "mm", 1.0),
+    "cm": ("length", "mm", 10.0),
+    "m": ("length", "mm", 1000.0),
+    "in": ("length", "mm", 25.4),
+    "n": ("force", "N", 1.0),
+    "kn": ("force", "N", 1000.0),
+    "n·m": ("moment", "N·m", 1.0),
+    "n-m": ("moment", "N·m", 1.0),
+    "nm": ("moment", "N·m", 1.0),
+    "kn·m": ("moment", "N·m", 1000.0),
+    "kn-m": ("moment", "N·m", 1000.0),
+    "knm": ("moment", "N·m", 1000.0),
+}
+
+_SUP = r"[ \t]*(?:<sup>)?[ \t]*"
+_SUP_END = r"[ \t]*(?:</sup>)?[ \t]*"
+
+# Longest spellings first so "kN·m" wins over "kN" and "mm" over "m".
+# Pressure and degree spellings ignore case ("Barg", "BARG", "Kg/Cm2g");
+# lengths and forces don't, so "m"/"M" and "N" stay distinct.
+_UNIT_ALTERNATION = "|".join([
+    r"(?i:kg/cm" + _SUP + r"2" + _SUP_END + r"(?:\(g\)|g\b)?)",
+    r"(?:°|º|o|<sup>\s*[0o°]\s*</sup>\s*)\s?[CF]",
+    r"(?:°|º)\s?[cf]",
+    r"(?i:deg\.?\s?[CF])",
+    r"k?N\s?[·\-]\s?m", r"k?Nm",
+    r"(?i:bar\(g\)|barg|mbar|millibar|bar)",
+    r"(?i:kPa\(g\)|kPag|kPa|MPa|psig|psi)",
+    r"mm", r"cm", r"m", r"in\.", r"kN", r"N",
+])
+_VALUE = r"[-+]?\d{1,3}(?:,\d{3})+(?:\.\d+)?|[-+]?\d+(?:\.\d+)?"
+
+PARAMETER_RE = re.compile(
+    r"(?<![\w.])(?P<value>" + _VALUE + r")"
+    r"[ \t]?(?P<unit>" + _UNIT_ALTERNATION + r")(?![A-Za-z0-9/²³])"
+)
+# "Pressure (Kg/Cm<sup>2</sup> g)" in a table header: the unit of the column
+HEADER_UNIT_RE = re.compile(r"\(\s*(?P<unit>" + _UNIT_ALTERNATION + r")\s*\)")
+BARE_VALUE_RE = re.compile(_VALUE)
+DIGIT_RE = re.compile(r"\d")
+MARKUP_RE = re.compile(r"<[^>]+>|\*\*|__|`|#+\s")
+NAME_BREAK_RE = re.compile(r".*(?:[.;:!?]\s|\|)")
+
+FILE_HEADER_RE = re.compile(r"^--- File: (?P<name>.+?) ---[ \t]*$", re.MULTILINE)
+# Most parameters listed in a prompt in place of their table rows
+PROMPT_PARAMETER_LIMIT = 80
+
+COLUMNS = (
+    "file", "page", "table", "name",
+    "value", "unit", "quantity", "si_value", "si_unit",
+)
+
+
+def _unit_key(unit: str) -> str:
+    key = "".join(MARKUP_RE.sub("", unit).lower().split()).replace(".", "")
+    if key[:1] in ("o", "0", "º") and key[-1:] in ("c", "f"):
+        key = "°" + key[-1]
+    return {"degc": "°c", "degf": "°f"}.get(key, key)
+
+
+def _normalise(value: float, unit: str):
+    quantity, si_unit, factor = UNITS.get(_unit_key(unit), (None, unit, 1.0))
+    if factor is None:  # Fahrenheit
+        return quantity, round((value - 32.0) * 5.0 / 9.0, 3), si_unit
+    return quantity, round(value * factor, 6), si_unit
+
+
+def _clean(text: str) -> str:
+    return " ".join(MARKUP_RE.sub(" ", text).split())
+
+
+def _display_unit(unit: str) -> str:
+    """Compact spelling of a matched unit, e.g. ``kg/cm <sup>2</sup> g`` -> ``kg/cm2g``."""
+    key = _unit_key(unit)
+    if key.startswith("°"):
+        return "°" + key[-1].upper()
+    return "".join(MARKUP_RE.sub("", unit).split())
+
+
+def _trim_name(name: str, width: int = 60) -> str:
+    if len(name) <= width:
+        return name
+    name = name[-width:]
+    return name[name.find(" ") + 1:]
+
+
+class ParameterTable:
+    """Columnar store of extracted parameters (one list per column)."""
+
+    def __init__(self):
+        for column in COLUMNS:
+            setattr(self, column, [])
+
+    def __len__(self):
+        return len(self.value)
+
+    def append(self, **row):
+        for column in COLUMNS:
+            getattr(self, column).append(row.get(column))
+
+    def extend(self, other: "ParameterTable"):
+        for column in COLUMNS:
+            getattr(self, column).extend(getattr(other, column))
+
+    def take(self, indices) -> "ParameterTable":
+        """Return a new table containing only the given row indices."""
+        result = ParameterTable()
+        for column in COLUMNS:
+            values = getattr(self, column)
+            setattr(result, column, [values[i] for i in indices])
+        return result
+
+    def filter(
+        self,
+        file: str = None,
+        quantity: str = None,
+        name: str = None,
+        page: int = None,
+    ) -> "ParameterTable":
+        """Filter rows by exact file/quantity/page and substring of name."""
+        needle = name.lower() if name else None
+        indices = [
+            i for i in range(len(self))
+            if (file is None or self.file[i] == file)
+            and (quantity is None or self.quantity[i] == quantity)
+            and (page is None or self.page[i] == page)
+            and (needle is None or needle in self.name[i].lower())
+        ]
+        return self.take(indices)
+
+    def rows(self) -> list[dict]:
+        return [
+            {column: getattr(self, column)[i] for column in COLUMNS}
+            for i in range(len(self))
+        ]
+
+    def to_columns(self) -> dict:
+        return {column: list(getattr(self, column)) for column in COLUMNS}
+
+
+def _cell_spans(text: str, row_start: int, row_end: int) -> list[tuple[int, int]]:
+    """Character spans of the cells of the pipe-table row at ``row_start``."""
+    pipes = [i for i in range(row_start, row_end) if text[i] == "|"]
+    return list(zip(pipes, pipes[1:]))
+
+
+def _header_columns(header: list[str], rows: list) -> tuple[dict, dict, int]:
+    """
+    Read column units and names from a table's header rows.
+
+    Returns ``(units, names, first_data_row)``: ``units`` maps a column to
+    the unit given in its header (``Pressure (Kg/Cm² g)``), carried right
+    across the empty cells of a merged header; ``names`` maps a column to
+    its header text, e.g. ``Pressure / Design`` for a unit row followed by
+    a ``Min | Normal | Max | Design`` row.
+    """
+    units: dict[int, str] = {}
+    groups: dict[int, str] = {}
+    subnames: dict[int, str] = {}
+    header_rows = [header] if header else []
+    first_data_row = 0
+    for _, cells in rows:
+        # A header row has no values and either names a unit or has a label
+        # (or nothing) in its first cell; "2 and below | Loads are considered
+        # negligible" is already data
+        if any(BARE_VALUE_RE.fullmatch(_clean(cell)) or PARAMETER_RE.search(cell) for cell in cells[1:]):
+            break
+        if not any(HEADER_UNIT_RE.search(cell) for cell in cells[1:]) and cells and DIGIT_RE.search(cells[0]):
+            break
+        header_rows.append(cells)
+        first_data_row += 1
+
+    for cells in header_rows:
+        if not any(HEADER_UNIT_RE.search(cell) for cell in cells[1:]):
+            for column, cell in enumerate(cells[1:], 1):
+                if _clean(cell):
+                    subnames[column] = _clean(cell)
+            continue
+        unit = group = None
+        for column, cell in enumerate(cells[1:], 1):
+            if _clean(cell):
+                found = HEADER_UNIT_RE.search(cell)
+                unit = found.group("unit") if found else None
+                group = _clean(HEADER_UNIT_RE.sub(" ", cell)) if found else None
+            if unit:
+                units[column] = unit
+                groups[column] = group
+
+    names = {
+        column: " / ".join(part for part in (groups.get(column), subnames.get(column)) if part)
+        for column in set(groups) | set(subnames)
+    }
+    return units, names, first_data_row
+
+
+def _iter_parameters(text: str):
+    """
+    Yield ``(offset, row_start, fields)`` for every value+unit pair in
+    ``text`` in document order; ``row_start`` is the offset of the table
+    row it sits in (``None`` outside tables).
+    """
+    # Map each table row's character span to (table label, header, cells)
+    row_spans: list[tuple[int, int, str, list[str], list[str]]] = []
+    header_hits: list[tuple[int, int, dict]] = []
+    for _, caption, _, _, header, rows in iter_tables(text):
+        units, names, first_data_row = _header_columns(header, rows)
+        for row_no, (offset, cells) in enumerate(rows):
+            end = text.find("\n", offset)
+            end = len(text) if end < 0 else end
+            row_spans.append((offset, end, caption, header, cells))
+            if not units or row_no < first_data_row:
+                continue
+            # Bare numbers in a column whose header gives the unit
+            row_name = _clean(cells[0]) if cells else ""
+            for column, (cell_start, cell_end) in enumerate(_cell_spans(text, offset, end)):
+                cell = _clean(text[cell_start + 1:cell_end])
+                if column in units and BARE_VALUE_RE.fullmatch(cell):
+                    header_hits.append((cell_start + 1, offset, {
+                        "table": caption,
+                        "name": " / ".join(part for part in (row_name, names.get(column)) if part),
+                        "value": cell,
+                        "unit": units[column],
+                    }))
+
+    hits = []
+    span_no = 0
+    for match in PARAMETER_RE.finditer(text):
+        start = match.start()
+        while span_no < len(row_spans) and row_spans[span_no][1] < start:
+            span_no += 1
+
+        label = row_start = None
+        if span_no < len(row_spans) and row_spans[span_no][0] <= start:
+            row_start, _, label, header, cells = row_spans[span_no]
+            column = text.count("|", row_start, start) - 1
+            row_name = _clean(cells[0]) if cells else ""
+            col_name = _clean(header[column]) if 0 <= column < len(header) else ""
+            if column <= 0:
+                name = col_name or row_name
+            else:
+                name = " / ".join(part for part in (row_name, col_name) if part)
+        else:
+            line_start = text.rfind("\n", 0, start) + 1
+            prefix = NAME_BREAK_RE.sub("", text[line_start:start])
+            name = _trim_name(_clean(prefix))
+
+        hits.append((start, row_start, {
+            "table": label,
+            "name": name,
+            "value": match.group("value"),
+            "unit": match.group("unit"),
+        }))
+
+    yield from sorted(hits + header_hits, key=lambda hit: hit[0])
+
+
+def extract_parameters(text: str, file_name: str = "") -> ParameterTable:
+    """
+    Scan Marker markdown for value+unit pairs, inline and in pipe tables.
+    Table cells holding a bare number take their unit from the column
+    header, e.g. ``Temperature (°C)``.
+    """
+    table = ParameterTable()
+    if not text:
+        return table
+
+    offsets, pages = page_index(text)
+    for start, _, hit in _iter_parameters(text):
+        value = float(hit["value"].replace(",", ""))
+        quantity, si_value, si_unit = _normalise(value, hit["unit"])
+        table.append(
+            file=file_name,
+            page=page_at(offsets, pages, start),
+            table=hit["table"],
+            name=hit["name"],
+            value=value,
+            unit=_display_unit(hit["unit"]),
+            quantity=quantity,
+            si_value=si_value,
+            si_unit=si_unit,
+        )
+
+    return table
+
+
+def _summary_entry(table: str, name: str, value: float, unit: str) -> str:
+    """``table | parameter | value | unit`` part of a parameter summary line."""
+    value = int(value) if value == int(value) else value
+    return f"{table or '-'} | {name} | {value} | {unit}"
+
+
+def format_parameter_summary(table: ParameterTable, limit: int = 300) -> str:
+    """
+    Render the parameter table as a short pipe-delimited list for the LLM.
+    Rows without a name carry no context and are skipped.
+    """
+    lines = ["file | page | table | parameter | value | unit"]
+    for i in range(len(table)):
+        if not table.name[i]:
+            continue
+        lines.append(
+            f"{table.file[i]} | {table.page[i]} | "
+            + _summary_entry(table.table[i], table.name[i], table.value[i], table.unit[i])
+        )
+        if len(lines) > limit:
+            break
+    return "\n".join(lines) if len(lines) > 1 else ""
+
+
+def restrict_summary(summary: str, text: str) -> str:
+    """
+    Keep only the lines of ``summary`` whose parameter also occurs in
+    ``text``, e.g. the changed sections of a new revision, so the LLM isn't
+    handed parameters it would re-list from unchanged sections.
+    """
+    if not summary:
+        return ""
+    found = {
+        _summary_entry(hit["table"], hit["name"], float(hit["value"].replace(",", "")), _display_unit(hit["unit"]))
+        for _, _, hit in _iter_parameters(text)
+    }
+    header, *lines = summary.splitlines()
+    kept = [line for line in lines if line.split(" | ", 2)[2] in found]
+    return "\n".join([header] + kept) if kept else ""
+
+
+def move_rows_to_summary(text: str, summary: str, limit: int = PROMPT_PARAMETER_LIMIT) -> tuple[str, str]:
+    """
+    Replace table rows of ``text`` by the parameter list, so the LLM gets a
+    short list instead of the raw rows rather than both. A row moves when
+    every value cell in it is listed in ``summary``; rows with any unlisted
+    or non-numeric value (notes, "Amb", "7 / F.V.") stay in the text whole,
+    and so do rows beyond ``limit`` listed parameters. Returns ``(text,
+    summary)`` with the summary cut down to the parameters of moved rows:
+    everything else is still in the text.
+    """
+    if not summary:
+        return text, ""
+    header, *lines = summary.splitlines()
+    listed = set(lines)
+    # Text without "--- File:" headers matches any file of the summary
+    unnamed = {line.split(" | ", 1)[1] for line in lines}
+
+    moved: list[str] = []
+    parts = []
+    for file_name, header_text, body in _split_files(text):
+        offsets, pages = page_index(body)
+        row_hits: dict[int, list[str]] = {}
+        for start, row_start, hit in _iter_parameters(body):
+            if row_start is not None:
+                value = float(hit["value"].replace(",", ""))
+                row_hits.setdefault(row_start, []).append(
+                    f"{page_at(offsets, pages, start)} | "
+                    + _summary_entry(hit["table"], hit["name"], value, _display_unit(hit["unit"]))
+                )
+
+        drop = []
+        for _, _, _, _, _, rows in iter_tables(body):
+            for offset, cells in rows:
+                entries = row_hits.get(offset)
+                values = [cell for cell in cells[1:] if _clean(cell) not in ("", "-")]
+                if not entries or len(entries) < len(values) or len(moved) + len(entries) > limit:
+                    continue
+                if file_name:
+                    entries = [f"{file_name} | {entry}" for entry in entries]
+                    if not all(entry in listed for entry in entries):
+                        continue
+                else:
+                    if not all(entry in unnamed for entry in entries):
+                        continue
+                    entries = [next(line for line in lines if line.endswith(" | " + entry)) for entry in entries]
+                moved.extend(entries)
+                end = body.find("\n", offset)
+                drop.append((offset, len(body) if end < 0 else end + 1))
+
+        parts.append(header_text)
+        position = 0
+        for start, end in drop:
+            parts.append(body[position:start])
+            position = end
+        parts.append(body[position:])
+
+    return "".join(parts), "\n".join([header] + moved) if moved else ""
+
+
+def _split_files(text: str) -> list[tuple[str, str, str]]:
+    """``(file_name, header, body)`` per ``--- File: name ---`` part of combined text."""
+    headers = list(FILE_HEADER_RE.finditer(text))
+    if not headers:
+        return [("", "", text)]
+    files = [("", "", text[:headers[0].start()])]
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        files.append((match.group("name"), text[match.start():match.end()], text[match.end():end]))
+    return files
+
+
+# In-memory lookup of parameters extracted during this process's lifetime
+PARAMETER_INDEX = ParameterTable()
+
+
+def register_parameters(table: ParameterTable) -> None:
+    """Add freshly extracted parameters to the process-wide lookup table."""
+    if table.file:
+        stale = set(table.file)
+        keep = [i for i, name in enumerate(PARAMETER_INDEX.file) if name not in stale]
+        replacement = PARAMETER_INDEX.take(keep)
+        for column in COLUMNS:
+            setattr(PARAMETER_INDEX, column, getattr(replacement, column))
+    PARAMETER_INDEX.extend(table)
+
+
+def lookup_parameters(**filters) -> ParameterTable:
+    """Filter the process-wide parameter table (see ``ParameterTable.filter``)."""
+    return PARAMETER_INDEX.filter(**filters)
@@ -1,212 +1,394 @@
 # pdf_service.py - UPDATED (remove decorative separators)
 import os
 from pathlib import Path
-import re
-import torch
 from marker.converters.pdf import PdfConverter
 from marker.models import create_model_dict
 from marker.output import text_from_rendered
 from model import process_with_openai
 from pdf_Convertor import text_to_pdf
-from services.file_service import get_unique_filename
+from services.file_service import get_unique_filename, file_digest
+from services.parameter_service import (
+    extract_parameters,
+    format_parameter_summary,
+    move_rows_to_summary,
+    restrict_summary,
+)
+from services.citation_service import resolve_citations
+from services.reference_service import find_references
+from services.revision_service import merge_analysis
+from services.cache_service import PageCache
+from services.markdown_service import compact_tables, join_pages, split_pages
+from services.scheduler_service import get_scheduler
+from services.report_service import atomic_path, report_id
+from services.format_service import format_report_lines, lines_to_text
+from services.profile_service import stage
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Emit "{page}----" separators so downstream services can tag page numbers
+CONVERTER_CONFIG = {"paginate_output": True}
+
+# Named Marker feature profiles: fidelity vs. speed. The LLM only ever sees
+# text, so image extraction is off in every profile but "full".
+# "fast-text" reads the PDF's text layer only: no OCR and no TableProcessor.
+# Marker renders a Table block from the cells that processor builds, so in
+# this profile table contents are dropped; it suits prose specs, while
+# design-data sheets need "tables" and scanned documents "ocr".
+EXTRACTION_PROFILES = {
+    "fast-text": {
+        "config": {"disable_image_extraction": True, "force_ocr": False, "disable_ocr": True, "use_llm": False},
+        "skip_processors": ("EquationProcessor", "TableProcessor", "LLM"),
+    },
+    "tables": {
+        "config": {"disable_image_extraction": True, "force_ocr": False, "use_llm": False},
+        "skip_processors": ("EquationProcessor", "LLM"),
+    },
+    "ocr": {
+        "config": {"disable_image_extraction": True, "force_ocr": True, "use_llm": False},
+        "skip_processors": ("LLM",),
+    },
+    "full": {
+        "config": {},
+        "skip_processors": (),
+    },
+}
+DEFAULT_PROFILE = os.getenv("EXTRACTION_PROFILE", "tables")
+
+REPORTS_DIR = Path("processed")
+
+
+class NoTextExtracted(ValueError):
+    """Marker found no text in a PDF with the given extraction profile."""
+
+    def __init__(self, profile: str):
+        message = f"Extraction profile '{profile}' found no text in the PDF"
+        if EXTRACTION_PROFILES[profile]["config"].get("disable_ocr"):
+            message += "; it has no text layer, use the 'ocr' profile for scanned documents"
+        super().__init__(message)
+        self.profile = profile
+
+
+def converter_settings(profile: str) -> tuple[dict, list]:
+    """
+    Return ``(config, processor_list)`` for a named extraction profile.
+    ``processor_list`` is ``None`` when Marker's defaults should be used.
+    """
+    if profile not in EXTRACTION_PROFILES:
+        raise ValueError(
+            f"Unknown extraction profile '{profile}'. "
+            f"Choose one of: {', '.join(EXTRACTION_PROFILES)}"
+        )
+    settings = EXTRACTION_PROFILES[profile]
+    config = dict(CONVERTER_CONFIG, **settings["config"])
+
+    skip = settings["skip_processors"]
+    if not skip:
+        return config, None
+    # Marker takes processors as dotted class paths
+    processors = [
+        f"{processor.__module__}.{processor.__name__}"
+        for processor in PdfConverter.default_processors
+        if not any(processor.__name__.startswith(name) for name in skip)
+    ]
+    return config, processors
+
+# Marker output per page fingerprint, shared by every document
+PAGE_CACHE = PageCache(Path("processed") / "page_cache")
+
 
 def format_processed_text(text: str, user_input: str) -> str:
     """
     Take OpenAI output and turn it into CLEAN PLAIN TEXT (no HTML) 
     NO decorative separators like dashes or n's
     """
-    from datetime import datetime
-
-    if not text:
-        return "No content available."
-
-    # Strip any LLM HTML / ReportLab markup completely
-    text = re.sub(r'<[^>]*>', '', text)
-    text = text.replace('&nbsp;', ' ')
-    text = text.replace('&bull;', '•')
-    text = text.replace('\u2011', '-')  # non‑breaking hyphen
-    text = text.replace('\u2013', '-')  # en dash
-    text = text.replace('\u2014', '-')  # em dash
-
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-
-    formatted: list[str] = []
-    
-    # Header block
-    formatted.append("ENGINEERING SPECIFICATION ANALYSIS")
-    formatted.append(f"Focus Area: {user_input if user_input else 'Entire Document'}")
-    formatted.append(f"Generated on {datetime.now().strftime('%B %d, %Y')}")
-    formatted.append("")
-
-    for line in lines:
-        l = line.strip()
-        if not l:
-            continue
-
-        lower = l.lower()
-
-        # Section-like lines (NO dashes underneath)
-        if any(kw in lower for kw in [
-            "purpose and scope",
-            "applicable codes",
-            "design and performance",
-            "material and component",
-            "loads, allowables",
-            "loads and allowables",
-            "execution, testing",
-            "execution requirements",
-            "client inputs",
-            "client requirements"
-        ]):
-            formatted.append("")
-            formatted.append(l)  # NO dashes, just the line
-
-        # Subsection-like lines
-        elif any(kw in lower for kw in [
-            "requirements:", "standard:", "standards:",
-            "specification:", "specifications:",
-            "data:", "table", "note:"
-        ]):
-            formatted.append("")
-            formatted.append(f"[SUBSECTION] {l}")
-
-        # Bullet-ish lines (including numbered)
-        elif l.startswith(("•", "-", "*")) or (l[:3].isdigit() and l[3:4] in {".", ")"}):
-            clean = re.sub(r'^[\-\*\•\d\)\.\s]+', '', l).strip()
-            formatted.append(f"  • {clean}")
-
-        # Source / reference lines
-        elif "(from" in lower:
-            formatted.append(f"    [SOURCE] {l}")
+    return lines_to_text(format_report_lines(text, user_input))
 
-        else:
-            formatted.append(l)
 
-    formatted.append("")
-    # NO decorative nnnnn or dashes - just simple END marker
-    formatted.append("END OF ENGINEERING SPECIFICATION ANALYSIS")
+def pdf_page_count(pdf_path: str) -> int:
+    """Number of pages in ``pdf_path``, or 0 if it can't be read."""
+    try:
+        import pypdfium2 as pdfium
+        pdf = pdfium.PdfDocument(pdf_path)
+        count = len(pdf)
+        pdf.close()
+        return count
+    except Exception:
+        return 0
 
-    return "\n".join(formatted)
 
+def page_fingerprints(pdf_path: str) -> list[str]:
+    """
+    Hash the text layer together with a small raster of every page so
+    unchanged pages can be recognised without running Marker. The raster
+    keeps pages apart that share their text (scanned sheets with the same
+    stamp or title block, drawings with the same annotations). Returns an
+    empty list if the PDF can't be read.
+    """
+    import hashlib
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return []
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from PDF using Marker with GPU if available."""
+    fingerprints = []
     try:
-        print(f"CUDA available: {torch.cuda.is_available()}")
-        if torch.cuda.is_available():
-            print(f"CUDA device count: {torch.cuda.device_count()}")
-            print(f"Current CUDA device: {torch.cuda.current_device()}")
-            print(f"CUDA device name: {torch.cuda.get_device_name(0)}")
-            print(
-                "CUDA memory allocated: "
-                f"{torch.cuda.memory_allocated(0) / 1024**3:.2f} GB"
-            )
+        pdf = pdfium.PdfDocument(pdf_path)
+        for page in pdf:
+            textpage = page.get_textpage()
+            digest = hashlib.sha256(" ".join(textpage.get_text_range().split()).encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(page.render(scale=0.25, grayscale=True).to_pil().tobytes())
+            fingerprints.append(digest.hexdigest())
+            textpage.close()
+            page.close()
+        pdf.close()
+    except Exception as e:
+        logger.warning(f"Could not fingerprint pages of {pdf_path}: {str(e)}")
+        return []
+    return fingerprints
+
+
+def extract_text_from_pdf(
+    pdf_path: str,
+    page_range: list[int] = None,
+    profile: str = DEFAULT_PROFILE,
+    use_cache: bool = True
+) -> str:
+    """
+    Extract text from PDF using Marker with GPU if available.
+    ``page_range`` limits extraction to the given 0-based page indices and
+    ``profile`` selects one of ``EXTRACTION_PROFILES``.
+
+    Pages already seen in any earlier document (same fingerprint) are taken
+    from the page cache; only the remaining pages are sent through Marker.
+    ``use_cache=False`` always runs Marker (e.g. to time a profile).
+    """
+    converter_settings(profile)  # fail fast on an unknown profile
+    with stage("fingerprint"):
+        fingerprints = page_fingerprints(pdf_path) if use_cache else None
+    if not fingerprints:
+        return _extract_with_marker(pdf_path, page_range, profile)
+
+    wanted = list(range(len(fingerprints))) if page_range is None else list(page_range)
+    pages: dict[int, str] = {}
+    missing: list[int] = []
+    for index in wanted:
+        cached = PAGE_CACHE.get(fingerprints[index], index, namespace=profile)
+        if cached is None:
+            missing.append(index)
         else:
-            print("CUDA not available - checking reasons:")
-            print(f"PyTorch version: {torch.__version__}")
-            print(f"PyTorch built with CUDA: {torch.cuda.is_built()}")
+            pages[index + 1] = cached
+
+    if missing:
+        fresh = split_pages(_extract_with_marker(pdf_path, missing, profile))
+        if len(missing) == 1 and list(fresh) == [1]:
+            fresh = {missing[0] + 1: fresh[1]}
+        for page, body in fresh.items():
+            PAGE_CACHE.put(fingerprints[page - 1], body, namespace=profile)
+        pages.update(fresh)
+
+    logger.info(
+        f"Page cache: {len(wanted) - len(missing)}/{len(wanted)} pages reused "
+        f"for {Path(pdf_path).name} (overall hit ratio {PAGE_CACHE.stats()['hit_ratio']:.0%})"
+    )
+    return join_pages(pages)
 
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        print(f"Using device: {device}")
 
+def _extract_with_marker(
+    pdf_path: str,
+    page_range: list[int] = None,
+    profile: str = DEFAULT_PROFILE
+) -> str:
+    """Run Marker on ``pdf_path`` (optionally only ``page_range``)."""
+    try:
         os.environ['TOKENIZERS_PARALLELISM'] = 'false'
 
-        try:
-            model_dict = create_model_dict()
-            if model_dict is None:
-                raise ValueError(
-                    "Failed to create model dictionary - Marker models not initialized"
+        config, processor_list = converter_settings(profile)
+        if page_range is not None:
+            config["page_range"] = list(page_range)
+
+        page_count = len(page_range) if page_range is not None else pdf_page_count(pdf_path)
+        with get_scheduler().slot(page_count) as slot:
+            logger.info(f"Extracting {Path(pdf_path).name} on {slot.device} (slot {slot.slot_id})")
+            try:
+                with stage("marker models"):
+                    artifact_dict = slot.models(create_model_dict)
+                converter = PdfConverter(
+                    artifact_dict=artifact_dict,
+                    processor_list=processor_list,
+                    config=config
                 )
+                with stage("marker"):
+                    rendered = converter(pdf_path)
+                    text, _, _ = text_from_rendered(rendered)
 
-            if torch.cuda.is_available():
-                for key in model_dict:
-                    if model_dict[key] is not None and hasattr(model_dict[key], "to"):
-                        model_dict[key] = model_dict[key].to(device)
+                if not text:
+                    raise NoTextExtracted(profile)
 
-            converter = PdfConverter(artifact_dict=model_dict)
-            rendered = converter(pdf_path)
-            text, _, _ = text_from_rendered(rendered)
+                return text
 
-            if not text:
-                raise ValueError("No text could be extracted from the PDF")
+            except AttributeError as ae:
+                if "disable_tqdm" in str(ae):
+                    print("Encountered tqdm configuration issue, attempting fallback...")
+                    try:
+                        from tqdm import tqdm
+                        tqdm.disable = True
 
-            return text
+                        converter = PdfConverter(
+                            artifact_dict=slot.models(create_model_dict),
+                            processor_list=processor_list,
+                            config=config
+                        )
+                        rendered = converter(pdf_path)
+                        text, _, _ = text_from_rendered(rendered)
+
+                        if not text:
+                            raise ValueError(
+                                "No text could be extracted from the PDF in fallback mode"
+                            )
+
+                        return text
+                    except Exception as fallback_error:
+                        raise Exception(
+                            f"Fallback extraction also failed: {str(fallback_error)}"
+                        )
+                else:
+                    raise ae
 
-        except AttributeError as ae:
-            if "disable_tqdm" in str(ae):
-                print("Encountered tqdm configuration issue, attempting fallback...")
-                try:
-                    from tqdm import tqdm
-                    tqdm.disable = True
+    except NoTextExtracted:
+        raise
+    except Exception as e:
+        raise Exception(f"Error extracting text from PDF: {str(e)}")
 
-                    model_dict = create_model_dict()
-                    if model_dict is None:
-                        raise ValueError(
-                            "Failed to create model dictionary in fallback mode"
-                        )
 
-                    converter = PdfConverter(artifact_dict=model_dict)
-                    rendered = converter(pdf_path)
-                    text, _, _ = text_from_rendered(rendered)
+def analyze_text(
+    text: str,
+    user_input: str = "",
+    parameter_summary: str = "",
+    reference_summary: str = "",
+    revision: dict = None
+) -> str:
+    """
+    Run extracted text through OpenAI and resolve its source labels.
 
-                    if not text:
-                        raise ValueError(
-                            "No text could be extracted from the PDF in fallback mode"
-                        )
+    ``revision`` is the info dict from ``revision_service.extract_incremental``
+    plus ``previous_analysis``; when given, only the changed sections are
+    sent to OpenAI and the result is merged into the previous analysis.
+    """
+    # OpenAI processing (only the changed sections for a new revision)
+    llm_text = text
+    if revision:
+        changed_text = revision["delta"]["changed_text"]
+        llm_text = f"\n\n--- File: {revision['file_name']} ---\n{changed_text}" if changed_text else ""
+        # Only the parameters and references of the changed sections, so
+        # unchanged ones aren't listed again next to the kept bullets
+        parameter_summary = restrict_summary(parameter_summary, changed_text)
+        cited = {designation for _, designation, _ in find_references(changed_text)}
+        reference_summary = "\n".join(
+            line for line in reference_summary.splitlines() if line.split(" | ", 1)[0] in cited
+        )
+    # Table rows fully covered by the parameter list are sent as the list
+    # only, and the remaining tables without their column padding
+    llm_text, parameter_summary = move_rows_to_summary(llm_text, parameter_summary)
+    llm_text = compact_tables(llm_text)
+
+    if llm_text:
+        print("OPENAI Processing")
+        with stage("openai"):
+            processed_text = process_with_openai(
+                llm_text,
+                user_input=user_input,
+                parameters=parameter_summary,
+                references=reference_summary
+            )
 
-                    return text
-                except Exception as fallback_error:
-                    raise Exception(
-                        f"Fallback extraction also failed: {str(fallback_error)}"
-                    )
-            else:
-                raise ae
+        # Fill in / verify "(From ...)" labels against the source outline
+        print("Resolving citations")
+        with stage("citations"):
+            processed_text, citation_stats = resolve_citations(processed_text, text)
+        logger.info(f"Citation labels: {citation_stats}")
+    else:
+        processed_text = ""
 
-    except Exception as e:
-        raise Exception(f"Error extracting text from PDF: {str(e)}")
+    if revision:
+        print("Merging with previous revision analysis")
+        processed_text = merge_analysis(
+            revision["previous_analysis"], processed_text, revision
+        )
+    return processed_text
+
+
+def render_report(processed_text: str, user_input: str, output_pdf_path: str) -> str:
+    """
+    Format an analysis as clean plain text and render it to a styled PDF.
+    The analysis is kept next to the report (``.txt``) so identical requests
+    can reuse both. Each file is written to a temporary name and published
+    only if it doesn't exist yet: a report id names fixed content, so a
+    concurrent identical job must not rewrite it.
+    """
+    output_pdf_path = Path(output_pdf_path)
+    with atomic_path(output_pdf_path.with_suffix(".txt"), overwrite=False) as tmp_path:
+        tmp_path.write_text(processed_text, encoding="utf-8")
+
+    print("Formatting")
+    with stage("format"):
+        report_lines = format_report_lines(processed_text, user_input)
+
+    # Direct text → PDF (no temp HTML), reusing the formatter's line kinds
+    print("Converting to PDF")
+    with stage("layout"), atomic_path(output_pdf_path, overwrite=False) as tmp_path:
+        text_to_pdf(lines_to_text(report_lines), str(tmp_path), report_lines)
+    return str(output_pdf_path)
 
 
 def process_pdf(
     input_pdf_path: str,
     user_input: str = "",
-    combined_text: str = None
+    combined_text: str = None,
+    parameter_summary: str = "",
+    reference_summary: str = "",
+    revision: dict = None,
+    output_pdf_path: str = None
 ) -> tuple[str, str]:
     """
     Process a PDF, run it through OpenAI, and generate a styled PDF.
     Returns (output_pdf_path_as_str, processed_text).
+
+    See ``analyze_text`` for ``revision``. ``output_pdf_path`` defaults to
+    the content-addressed report path for ``input_pdf_path`` alone.
     """
     try:
         # 1. Extract or reuse text
         if combined_text is None:
-            text = extract_text_from_pdf(input_pdf_path)
+            with stage("extract"):
+                text = extract_text_from_pdf(input_pdf_path)
+            if not parameter_summary:
+                parameter_summary = format_parameter_summary(
+                    extract_parameters(text, Path(input_pdf_path).name)
+                )
         else:
             text = combined_text
 
-        # 2. OpenAI processing
-        print("OPENAI Processing")
-        processed_text = process_with_openai(text, user_input=user_input)
-
-        # 3. Format as clean plain text
-        print("Formatting")
-        formatted_text = format_processed_text(processed_text, user_input)
-
-        # 4. Output path
-        print("Generating output filename")
-        input_path = Path(input_pdf_path)
-        output_filename = f"{input_path.stem}_Specs.pdf"
-        processed_dir = Path("processed")
-        processed_dir.mkdir(exist_ok=True)
-        output_pdf_path = processed_dir / output_filename
-
-        # 5. Direct text → PDF (no temp HTML)
-        print("Converting to PDF")
-        text_to_pdf(formatted_text, str(output_pdf_path))
+        # 2. OpenAI analysis with resolved citations
+        with stage("analyze"):
+            processed_text = analyze_text(
+                text,
+                user_input=user_input,
+                parameter_summary=parameter_summary,
+                reference_summary=reference_summary,
+                revision=revision
+            )
+
+        # 3. Format and render the report
+        if output_pdf_path is None:
+            output_pdf_path = REPORTS_DIR / (
+                report_id([f"{file_digest(input_pdf_path)}-{DEFAULT_PROFILE}"], user_input) + ".pdf"
+            )
+        with stage("render"):
+            render_report(processed_text, user_input, output_pdf_path)
 
         print("Returning string paths")
         return str(output_pdf_path), processed_text
@@ -0,0 +1,222 @@
+"""
+Opt-in sampling profiler for individual jobs.
+
+A background thread samples the Python stack of the job's thread every few
+milliseconds (``PROFILE_INTERVAL``, default 5 ms), so the job itself runs
+unmodified and the overhead stays low. Pipeline code marks its stages with
+``stage("marker")`` etc.; those names become the roots of the flame graph.
+When no profiler is active on the current thread ``stage`` does nothing.
+
+Results are saved as collapsed stacks (``.folded``, for flamegraph.pl or
+speedscope), a self-contained SVG flame graph and a top-N summary of the
+hottest functions.
+"""
+import html
+import os
+import sys
+import threading
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+DEFAULT_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+TOP_N = 25
+
+_local = threading.local()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, interval: float = None, thread_id: int = None):
+        self.interval = interval or DEFAULT_INTERVAL
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.stages: list[str] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stages = [f"[{name}]" for name in tuple(self.stages)]
+            self.stacks[";".join(stages + stack[::-1])] += 1
+
+    def folded(self) -> str:
+        return folded_text(self.stacks)
+
+    def save(self, directory: Path, name: str, title: str = None) -> dict:
+        return save_profile(self.stacks, directory, name, title, self.interval)
+
+
+@contextmanager
+def profiled(enabled: bool = True, interval: float = None):
+    """
+    Profile the current thread for the duration of the block. Yields the
+    ``SamplingProfiler`` (or ``None`` when not ``enabled``).
+    """
+    if not enabled:
+        yield None
+        return
+    profiler = SamplingProfiler(interval).start()
+    previous = getattr(_local, "profiler", None)
+    _local.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _local.profiler = previous
+        profiler.stop()
+
+
+@contextmanager
+def stage(name: str):
+    """Label samples taken inside the block with pipeline stage ``name``."""
+    profiler = getattr(_local, "profiler", None)
+    if profiler is None:
+        yield
+        return
+    profiler.stages.append(name)
+    try:
+        yield
+    finally:
+        profiler.stages.pop()
+
+
+def sampled_call(enabled: bool, fn, *args, **kwargs):
+    """
+    Call ``fn``, profiling it when ``enabled``. Returns ``(result, folded)``
+    where ``folded`` is the collapsed-stack text ("" when not enabled), so a
+    worker process can hand its profile back to the parent.
+    """
+    with profiled(enabled) as profiler:
+        result = fn(*args, **kwargs)
+    return result, profiler.folded() if profiler else ""
+
+
+def folded_text(stacks: Counter) -> str:
+    """Collapsed-stack text: one ``frame;frame;frame count`` line per stack."""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+
+def merge_folded(stacks: Counter, folded: str) -> None:
+    """Add collapsed-stack text (e.g. from a worker process) into ``stacks``."""
+    for line in folded.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if stack:
+            stacks[stack] += int(count)
+
+
+def summarize(stacks: Counter, interval: float = DEFAULT_INTERVAL, top: int = TOP_N) -> str:
+    """Hottest functions by self and inclusive samples."""
+    total = sum(stacks.values())
+    if not total:
+        return "No samples collected."
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            inclusive[frame] += count
+
+    lines = [
+        f"{total} samples at {interval * 1000:.1f} ms (~{total * interval:.1f} s sampled)",
+        "",
+        f"Top {top} by self time:",
+    ]
+    for frame, count in own.most_common(top):
+        lines.append(f"  {count / total:6.1%}  {count * interval:8.2f}s  {frame}")
+    lines += ["", f"Top {top} by inclusive time:"]
+    for frame, count in inclusive.most_common(top):
+        lines.append(f"  {count / total:6.1%}  {count * interval:8.2f}s  {frame}")
+    return "\n".join(lines)
+
+
+def save_profile(
+    stacks: Counter,
+    directory: Path,
+    name: str,
+    title: str = None,
+    interval: float = DEFAULT_INTERVAL,
+) -> dict:
+    """Write ``<name>_profile.{folded,svg,txt}`` to ``directory``; returns the paths."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "folded": directory / f"{name}_profile.folded",
+        "flamegraph": directory / f"{name}_profile.svg",
+        "summary": directory / f"{name}_profile.txt",
+    }
+    paths["folded"].write_text(folded_text(stacks), encoding="utf-8")
+    paths["flamegraph"].write_text(flamegraph_svg(stacks, title or name), encoding="utf-8")
+    paths["summary"].write_text(summarize(stacks, interval), encoding="utf-8")
+    return {kind: str(path) for kind, path in paths.items()}
+
+
+def flamegraph_svg(stacks: Counter, title: str = "", width: int = 1200) -> str:
+    """Self-contained SVG flame graph of collapsed ``stacks``."""
+    root = {"children": {}, "count": 0}
+    for stack, count in stacks.items():
+        node = root
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"children": {}, "count": 0})
+            node["count"] += count
+
+    row, top = 16, 40
+    total = root["count"] or 1
+    rects = []
+    depth_max = 0
+
+    def place(node: dict, x: float, depth: int) -> None:
+        nonlocal depth_max
+        for frame, child in sorted(node["children"].items()):
+            w = child["count"] / total * (width - 20)
+            if w >= 0.5:
+                depth_max = max(depth_max, depth)
+                rects.append((frame, child["count"], 10 + x, depth, w))
+                place(child, x, depth + 1)
+            x += w
+
+    place(root, 0.0, 0)
+    height = top + (depth_max + 1) * row + 10
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="Verdana" font-size="11">',
+        '<rect width="100%" height="100%" fill="#f8f8f8"/>',
+        f'<text x="{width / 2}" y="24" text-anchor="middle" font-size="16">{html.escape(title)}</text>',
+    ]
+    for frame, count, x, depth, w in rects:
+        y = height - 10 - (depth + 1) * row
+        hue = zlib.crc32(frame.encode("utf-8")) % 40
+        tooltip = html.escape(f"{frame} ({count} samples, {count / total:.1%})")
+        text = html.escape(frame[: int(w / 7)]) if w > 35 else ""
+        parts.append(
+            f'<g><title>{tooltip}</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue + 10},85%,60%)" rx="2"/>'
+            f'<text x="{x + 3:.1f}" y="{y + 11}">{text}</text></g>'
+        )
+    parts.append("</svg>")
+    return "\n".join(parts)
@@ -0,0 +1,151 @@
+"""
+Inverted index of codes, standards and project document numbers.
+
+While documents are extracted we record every cited designation
+(``ASME B31.3``, ``API 650``, ``IS 2062``...) and project document number
+(``7650-8230-SP-100-0001``, ``10080-1-SS-ME-004``...) against the file and
+pages that cite it. Section 2 of the analysis and questions such as
+"which specs cite API 650?" can then be answered from the index directly.
+"""
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from services.markdown_service import page_index, page_at
+
+STANDARD_RE = re.compile(
+    r"(?<![A-Za-z0-9])"
+    r"(?P<body>ASME|API|ASTM|ANSI|BS[ \t]?EN|BS|EN|ISO|IEC|IEEE|IS|WRC|NACE|MSS|AWS|OISD|NFPA|DIN|TEMA)"
+    r"(?:[ \t]*-[ \t]*|[ \t]*)"
+    r"(?:"
+    r"(?P<section>Sec(?:tion)?\.?[ \t]*(?P<roman>[IVX]+)"
+    r"(?:[ \t]*,?[ \t]*Div(?:ision)?\.?[ \t]*(?P<division>\d))?)"
+    r"|(?:(?P<series>RP|STD|Std|SP|MR|TM|PTC)[ \t]*-?[ \t]*)?"
+    r"(?P<number>[A-Z]{0,2}\d+(?:\.\d+)*[A-Z]?)"
+    r")(?![A-Za-z0-9])"
+)
+DOCUMENT_NUMBER_RE = re.compile(
+    r"(?<![A-Za-z0-9-])"
+    r"(?=[A-Z0-9-]*[A-Z])(?=[A-Z0-9-]*\d)"
+    r"[A-Z0-9]{2,6}(?:-[A-Z0-9]{1,6}){3,6}"
+    r"(?![A-Za-z0-9-])"
+)
+
+
+def normalise_standard(match: re.Match) -> str:
+    """Canonical spelling of a standard designation, e.g. ``API-650`` -> ``API 650``."""
+    body = " ".join(match.group("body").upper().split())
+    if body == "BSEN":
+        body = "BS EN"
+    if match.group("section"):
+        designation = f"{body} Section {match.group('roman')}"
+        if match.group("division"):
+            designation += f" Div {match.group('division')}"
+        return designation
+    series = match.group("series")
+    if series:
+        return f"{body} {series.upper()} {match.group('number')}"
+    return f"{body} {match.group('number')}"
+
+
+def find_references(text: str) -> list[tuple[str, str, int]]:
+    """Return ``(kind, designation, page)`` for every citation in ``text``."""
+    offsets, pages = page_index(text)
+    found = []
+    for match in STANDARD_RE.finditer(text):
+        found.append(("standard", normalise_standard(match), page_at(offsets, pages, match.start())))
+    for match in DOCUMENT_NUMBER_RE.finditer(text):
+        found.append(("document", match.group(0), page_at(offsets, pages, match.start())))
+    return found
+
+
+class ReferenceIndex:
+    """Designation -> {file: sorted pages}, persisted as JSON."""
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else None
+        self.kinds: dict[str, str] = {}
+        self.postings: dict[str, dict[str, list[int]]] = {}
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            self.load()
+
+    def add_document(self, file_name: str, text: str) -> int:
+        """Index (or re-index) one document. Returns the number of citations."""
+        found = find_references(text)
+        with self._lock:
+            self._remove_file(file_name)
+            for kind, designation, page in found:
+                self.kinds[designation] = kind
+                pages = self.postings.setdefault(designation, {}).setdefault(file_name, [])
+                if page not in pages:
+                    pages.append(page)
+                    pages.sort()
+        return len(found)
+
+    def _remove_file(self, file_name: str) -> None:
+        for designation in list(self.postings):
+            files = self.postings[designation]
+            files.pop(file_name, None)
+            if not files:
+                del self.postings[designation]
+                self.kinds.pop(designation, None)
+
+    def lookup(self, designation: str) -> dict[str, list[int]]:
+        """Exact lookup; accepts loose spellings such as ``api-650``."""
+        key = designation.strip()
+        match = STANDARD_RE.fullmatch(key.upper())
+        if match:
+            key = normalise_standard(match)
+        with self._lock:
+            return {name: list(pages) for name, pages in self.postings.get(key, {}).items()}
+
+    def search(self, query: str = "", kind: str = None, file: str = None) -> dict:
+        """Case-insensitive substring search over designations."""
+        needle = " ".join(query.replace("-", " ").upper().split())
+        results = {}
+        with self._lock:
+            for designation, files in self.postings.items():
+                if kind and self.kinds.get(designation) != kind:
+                    continue
+                if file and file not in files:
+                    continue
+                if needle and needle not in designation.replace("-", " ").upper():
+                    continue
+                results[designation] = {
+                    "kind": self.kinds[designation],
+                    "files": {name: list(pages) for name, pages in files.items()},
+                }
+        return dict(sorted(results.items()))
+
+    def summary_for(self, file_names: list[str]) -> str:
+        """Short ``designation | file (pages)`` list for the LLM's Section 2."""
+        lines = []
+        with self._lock:
+            postings = sorted((designation, dict(files)) for designation, files in self.postings.items())
+        for designation, files in postings:
+            cited = [
+                f"{name} (p. {', '.join(map(str, pages))})"
+                for name, pages in files.items() if name in file_names
+            ]
+            if cited:
+                lines.append(f"{designation} | {'; '.join(cited)}")
+        return "\n".join(lines)
+
+    def load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        self.kinds = data.get("kinds", {})
+        self.postings = data.get("postings", {})
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Temporary name per process and thread, so concurrent saves never
+        # rename each other's file away
+        tmp_path = self.path.with_name(f".{self.path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with self._lock:
+            tmp_path.write_text(json.dumps({"kinds": self.kinds, "postings": self.postings}), encoding="utf-8")
+            tmp_path.replace(self.path)
@@ -0,0 +1,190 @@
+"""
+Report lookup and HTTP caching for generated ``_Specs.pdf`` reports.
+
+Reports are addressed by id (the file name without ``.pdf``) and served with
+a strong ETag derived from their SHA-256. The digest is remembered per
+(size, mtime) so a repeat view costs one ``stat`` call, and a matching
+``If-None-Match`` is answered with 304 without opening the file. Single
+byte ranges are supported so viewers can fetch pages lazily and resume.
+
+Report ids are content addressed: a hash of the input artifacts, the focus
+area, the prompt version and the model. Identical requests map to the same
+report, which is reused instead of regenerated and never changes once
+written, so it can be cached by clients indefinitely. Reports and their
+analysis text are written to a temporary file and renamed into place, so
+concurrent writers and readers never see a partial file.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from model import MODEL, PROMPT_VERSION
+from services.file_service import file_digest
+
+REPORT_ID_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9 ._()-]*")
+CONTENT_ID_RE = re.compile(r"[0-9a-f]{32}_Specs")
+RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+CHUNK_SIZE = 256 * 1024
+
+
+def report_id(
+    input_ids: list[str],
+    user_input: str,
+    prompt_version: str = PROMPT_VERSION,
+    model: str = MODEL
+) -> str:
+    """
+    Content-addressed id of the report for ``input_ids`` (artifact ids, i.e.
+    file hash plus extraction profile; order doesn't matter) analysed for
+    ``user_input`` with the given prompt version and model.
+    """
+    key = json.dumps(
+        {
+            "inputs": sorted(set(input_ids)),
+            "focus": user_input.strip(),
+            "prompt": prompt_version,
+            "model": model,
+        },
+        sort_keys=True,
+    )
+    return f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}_Specs"
+
+
+def cache_control(report_id: str) -> str:
+    """Content-addressed reports never change; legacy names may be rewritten."""
+    if CONTENT_ID_RE.fullmatch(report_id):
+        return "public, max-age=31536000, immutable"
+    return "no-cache"
+
+
+@contextmanager
+def atomic_path(path: Path, overwrite: bool = True):
+    """
+    Yield a temporary path next to ``path`` and rename it over ``path`` once
+    the block completes; the temporary file is removed if it fails. With
+    ``overwrite=False`` the file is published by hard link instead, and an
+    existing ``path`` is left untouched.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{path.suffix}")
+    try:
+        yield tmp_path
+        if overwrite:
+            os.replace(tmp_path, path)
+        else:
+            try:
+                os.link(tmp_path, path)
+            except FileExistsError:
+                pass
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the report."""
+
+
+class ReportStore:
+    """Generated reports in one directory, with cached content digests."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._etags: dict[str, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, report_id: str) -> Path:
+        """Path of ``report_id``, or ``None`` if the id is invalid or unknown."""
+        if not REPORT_ID_RE.fullmatch(report_id) or ".." in report_id:
+            return None
+        path = self.output_path(report_id)
+        return path if path.is_file() else None
+
+    def output_path(self, report_id: str) -> Path:
+        return self.directory / f"{report_id}.pdf"
+
+    def analysis(self, report_id: str) -> str:
+        """Analysis text behind a finished report, or ``None``."""
+        if self.path(report_id) is None:
+            return None
+        text_path = self.directory / f"{report_id}.txt"
+        return text_path.read_text(encoding="utf-8") if text_path.is_file() else None
+
+    def save_inputs(self, report_id: str, inputs: list[dict], user_input: str) -> None:
+        """Record which artifacts (``{"file", "artifact_id"}``) a report was built from."""
+        with atomic_path(self.directory / f"{report_id}.json") as tmp_path:
+            tmp_path.write_text(json.dumps({"focus": user_input, "inputs": inputs}), encoding="utf-8")
+
+    def inputs(self, report_id: str) -> dict:
+        """``{"focus", "inputs"}`` recorded for a report, or ``None``."""
+        if self.path(report_id) is None:
+            return None
+        inputs_path = self.directory / f"{report_id}.json"
+        if not inputs_path.is_file():
+            return None
+        with open(inputs_path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def etag(self, path: Path) -> tuple[str, os.stat_result]:
+        """Strong ETag for ``path``, hashing it only when it has changed."""
+        stat = path.stat()
+        key = str(path)
+        with self._lock:
+            cached = self._etags.get(key)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2], stat
+        tag = f'"{file_digest(str(path))}"'
+        with self._lock:
+            self._etags[key] = (stat.st_size, stat.st_mtime_ns, tag)
+        return tag, stat
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """Whether an ``If-None-Match`` header value matches ``etag``."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def parse_range(header: str, size: int) -> tuple[int, int]:
+    """
+    Parse a single ``bytes=`` range into inclusive ``(start, end)``.
+    Returns ``None`` when the header is absent, invalid (e.g. ``bytes=5-3``)
+    or not a single byte range, so the whole file is sent; raises
+    ``RangeNotSatisfiable`` when it starts beyond ``size``.
+    """
+    match = RANGE_RE.fullmatch(header.strip()) if header else None
+    if not match or match.group(0) == "bytes=-":
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start >= size:
+        raise RangeNotSatisfiable(f"bytes */{size}")
+    return start, end
+
+
+def iter_file_range(path: Path, start: int, end: int):
+    """Yield bytes ``start..end`` (inclusive) of ``path`` in chunks."""
+    remaining = end - start + 1
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
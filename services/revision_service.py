@@ -0,0 +1,325 @@
+"""
+Revision-aware incremental extraction and analysis.
+
+Specs arrive as successive revisions of one document number, e.g.
+``7650-8230-SP-100-0001_A6_...pdf`` followed by ``..._A14_...pdf``. For each
+document number and extraction profile we keep the latest extraction, its
+page fingerprints and the analyses produced from it. A new revision only sends changed pages through
+Marker, and only changed sections through the LLM; the result is merged
+into the previous analysis together with a change summary.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from difflib import SequenceMatcher
+from pathlib import Path
+from services.citation_service import MIN_MATCHED_TOKENS, SOURCE_LABEL_RE, DocumentOutline
+from services.markdown_service import (
+    PAGE_SEPARATOR_RE,
+    join_pages,
+    split_pages,
+    split_sections,
+)
+from services.reference_service import DOCUMENT_NUMBER_RE
+
+logger = logging.getLogger(__name__)
+
+REVISION_RE = re.compile(
+    r"(?:_(?P<code>[A-Z]{0,3}\d{1,3})(?=_|$)|\bRev\.?[ _-]?(?P<rev>[A-Z0-9]{1,4})\b)",
+    re.IGNORECASE,
+)
+ANALYSIS_HEADING_RE = re.compile(r"^\s*(?:#+\s*)?(?:\*\*)?(?P<number>[1-7])\.\s+\S")
+BULLET_RE = re.compile(r"^\s*[-*•]\s+")
+
+
+def parse_document_identity(file_name: str) -> tuple[str, str]:
+    """
+    Return ``(document_number, revision)`` from an upload file name, e.g.
+    ``7650-8230-SP-100-0001_A6_Piping Standard.pdf`` -> ``("7650-8230-SP-100-0001", "A6")``.
+    Either part is ``None`` when it can't be recognised.
+    """
+    stem = Path(file_name).stem
+    number = DOCUMENT_NUMBER_RE.search(stem)
+    if not number:
+        return None, None
+    revision = REVISION_RE.search(stem, number.end())
+    if not revision:
+        return number.group(0), None
+    return number.group(0), (revision.group("code") or revision.group("rev")).upper()
+
+
+def _safe_name(value: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", value)
+
+
+class RevisionStore:
+    """Latest extraction and analyses per document number and profile, kept on disk."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / "index.json"
+        self.documents: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as fh:
+                self.documents = json.load(fh)
+
+    @staticmethod
+    def key(document: str, profile: str = None) -> str:
+        """
+        Entry key of ``document`` extracted with ``profile``. Extractions of
+        different fidelity are kept apart so pages are never reused across
+        profiles.
+        """
+        return f"{document}@{profile}" if profile else document
+
+    def latest(self, document: str) -> dict:
+        with self._lock:
+            entry = self.documents.get(document)
+            return dict(entry) if entry else None
+
+    def load_text(self, entry: dict) -> str:
+        return (self.directory / entry["text_path"]).read_text(encoding="utf-8")
+
+    def save_extraction(
+        self,
+        document: str,
+        revision: str,
+        file_name: str,
+        fingerprints: list[str],
+        text: str,
+        keep_analyses: bool = False,
+    ) -> None:
+        text_path = f"{_safe_name(document)}_{_safe_name(revision or 'unrevised')}.md"
+        (self.directory / text_path).write_text(text, encoding="utf-8")
+        with self._lock:
+            previous = self.documents.get(document, {})
+            self.documents[document] = {
+                "revision": revision,
+                "file": file_name,
+                "fingerprints": fingerprints,
+                "text_path": text_path,
+                "analyses": previous.get("analyses", {}) if keep_analyses else {},
+            }
+            self._save()
+
+    def save_analysis(self, document: str, user_input: str, analysis: str) -> None:
+        with self._lock:
+            entry = self.documents.get(document)
+            if entry is None:
+                return
+            entry.setdefault("analyses", {})[user_input] = analysis
+            self._save()
+
+    def _save(self) -> None:
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.documents), encoding="utf-8")
+        tmp_path.replace(self.index_path)
+
+
+def _section_hashes(text: str) -> dict[str, tuple[str, str]]:
+    """``{label: (hash, body)}`` with page separators removed."""
+    sections = {}
+    for label, body in split_sections(PAGE_SEPARATOR_RE.sub("", text)):
+        normalised = " ".join(body.split())
+        sections[label] = (hashlib.sha256(normalised.encode("utf-8")).hexdigest(), body)
+    return sections
+
+
+def section_delta(old_text: str, new_text: str) -> dict:
+    """Compare two extractions section by section."""
+    old = _section_hashes(old_text)
+    new = _section_hashes(new_text)
+    changed = [label for label in new if label in old and new[label][0] != old[label][0]]
+    added = [label for label in new if label not in old]
+    removed = [label for label in old if label not in new]
+    changed_text = "\n\n".join(
+        new[label][1].strip() for label in new if label in changed or label in added
+    )
+    return {
+        "changed": changed,
+        "added": added,
+        "removed": removed,
+        "changed_text": changed_text,
+    }
+
+
+def extract_incremental(
+    pdf_path: str,
+    file_name: str,
+    store: RevisionStore,
+    extract,
+    fingerprint,
+    profile: str = None
+):
+    """
+    Extract ``pdf_path``, reusing the cached extraction of the previous
+    revision for every page whose fingerprint is unchanged. Only a previous
+    revision extracted with the same ``profile`` is reused.
+
+    ``extract(pdf_path, page_range=None)`` and ``fingerprint(pdf_path)`` are
+    the Marker extraction and page hashing functions. Returns ``(text, info)``
+    where ``info`` describes the revision (``entry`` is its store key, for
+    ``save_analysis``) and, when a previous revision was
+    known, the section-level ``delta``, its stored ``previous_analyses`` and
+    the ``previous_text`` they were produced from.
+    """
+    document, revision = parse_document_identity(file_name)
+    entry = store.key(document, profile) if document else None
+    info = {"document": document, "entry": entry, "revision": revision, "previous": None}
+    if not document:
+        return extract(pdf_path), info
+
+    fingerprints = fingerprint(pdf_path)
+    previous = store.latest(entry)
+    if not previous or not fingerprints or not previous.get("fingerprints"):
+        text = extract(pdf_path)
+        store.save_extraction(entry, revision, file_name, fingerprints, text)
+        return text, info
+
+    old_text = store.load_text(previous)
+    old_pages = split_pages(old_text)
+    pages: dict[int, str] = {}
+    changed: list[int] = []
+    matcher = SequenceMatcher(None, previous["fingerprints"], fingerprints, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            changed.extend(range(j1, j2))
+            continue
+        for k in range(i2 - i1):
+            cached = old_pages.get(i1 + k + 1)
+            if cached is None:
+                changed.append(j1 + k)
+            else:
+                pages[j1 + k + 1] = cached
+
+    if changed:
+        fresh = split_pages(extract(pdf_path, page_range=changed))
+        if len(changed) == 1 and list(fresh) == [1]:
+            fresh = {changed[0] + 1: fresh[1]}
+        pages.update(fresh)
+    text = join_pages(pages)
+
+    logger.info(
+        f"{document}: revision {previous['revision']} -> {revision}, "
+        f"re-extracted {len(changed)} of {len(fingerprints)} pages"
+    )
+    info.update(
+        previous=previous["revision"],
+        changed_pages=[page + 1 for page in sorted(changed)],
+        reused_pages=len(fingerprints) - len(changed),
+        delta=section_delta(old_text, text),
+        previous_analyses=previous.get("analyses", {}),
+        previous_text=old_text,
+    )
+    store.save_extraction(
+        entry, revision, file_name, fingerprints, text,
+        keep_analyses=not changed and previous["revision"] == revision,
+    )
+    return text, info
+
+
+def _split_analysis(analysis: str) -> tuple[list[str], dict[str, list[str]]]:
+    """Split an analysis into leading lines and ``{section_number: lines}``."""
+    preamble: list[str] = []
+    sections: dict[str, list[str]] = {}
+    current = None
+    for line in analysis.split("\n"):
+        heading = ANALYSIS_HEADING_RE.match(line)
+        if heading:
+            current = heading.group("number")
+            sections[current] = [line]
+        elif current is None:
+            preamble.append(line)
+        else:
+            sections[current].append(line)
+    return preamble, sections
+
+
+def _cites(line: str, labels: list[str]) -> bool:
+    for label in labels:
+        label = label.split(" #")[0]
+        if re.search(rf"(?<![\w.]){re.escape(label)}(?![\w.])", line, re.IGNORECASE):
+            return True
+    return False
+
+
+def _is_stale(line: str, outline: DocumentOutline, stale: set[str], labels: list[str]) -> bool:
+    """
+    Whether a bullet of the previous analysis came from a changed or removed
+    section. The bullet is matched back to its source span in the previous
+    extraction, so labels such as "(From Table 3, Page 2)" that don't name
+    the section don't matter; only bullets that can't be matched fall back
+    to the section numbers in their label.
+    """
+    body = BULLET_RE.sub("", line)
+    label = SOURCE_LABEL_RE.search(body)
+    ranked = outline.rank(body[:label.start()] if label else body, limit=1) if outline else []
+    if not ranked or ranked[0][2] < MIN_MATCHED_TOKENS:
+        return _cites(line, labels)
+    return (outline.spans[ranked[0][0]]["section"] or "Preamble") in stale
+
+
+def _claim(line: str) -> str:
+    """A bullet's statement without its marker, source label, case or spacing."""
+    body = BULLET_RE.sub("", line)
+    label = SOURCE_LABEL_RE.search(body)
+    return " ".join((body[:label.start()] if label else body).lower().split())
+
+
+def change_summary(info: dict) -> str:
+    delta = info["delta"]
+    lines = [f"Revision Changes ({info['previous']} to {info['revision']}):"]
+    if info.get("changed_pages"):
+        lines.append(f"- Re-extracted pages: {', '.join(map(str, info['changed_pages']))}")
+    for key, title in (("changed", "Changed"), ("added", "Added"), ("removed", "Removed")):
+        if delta[key]:
+            lines.append(f"- {title} sections: {', '.join(delta[key])}")
+    if len(lines) == 1:
+        lines.append("- No content changes detected")
+    return "\n".join(lines)
+
+
+def merge_analysis(previous: str, update: str, info: dict) -> str:
+    """
+    Merge a re-analysis of the changed sections into the previous analysis.
+    Bullets whose source lies in a changed or removed section of the
+    previous extraction (``info["previous_text"]``) are dropped, the new
+    bullets not already kept are appended under the same numbered heading,
+    and a change summary is placed at the top.
+    """
+    delta = info["delta"]
+    labels = delta["changed"] + delta["removed"]
+    stale = {label.split(" #")[0] for label in labels}
+    outline = DocumentOutline.from_text(info["previous_text"]) if info.get("previous_text") else None
+    preamble, old_sections = _split_analysis(previous)
+    if preamble and preamble[0].startswith("Revision Changes ("):
+        # Drop the summary left over from an earlier merge
+        blank = preamble.index("") if "" in preamble else len(preamble)
+        preamble = preamble[blank + 1:]
+    _, new_sections = _split_analysis(update or "")
+
+    merged = [change_summary(info), ""] + preamble
+    for number in sorted(set(old_sections) | set(new_sections)):
+        old_lines = old_sections.get(number, [])
+        new_bullets = [
+            line for line in new_sections.get(number, [])[1:]
+            if BULLET_RE.match(line) and "none found" not in line.lower()
+        ]
+        heading = old_lines[0] if old_lines else new_sections[number][0]
+        kept = [
+            line for line in old_lines[1:]
+            if not (BULLET_RE.match(line) and "none found" not in line.lower()
+                    and _is_stale(line, outline, stale, labels))
+            and not (new_bullets and "none found" in line.lower())
+        ]
+        while kept and not kept[-1].strip():
+            kept.pop()
+        # The re-analysis may repeat bullets that are still kept
+        claims = {_claim(line) for line in kept if BULLET_RE.match(line)}
+        new_bullets = [line for line in new_bullets if _claim(line) not in claims]
+        merged.extend([heading] + kept + new_bullets + [""])
+    return "\n".join(merged).rstrip() + "\n"
@@ -0,0 +1,261 @@
+"""
+Bulk generation of vendor RFQ packets from one completed analysis.
+
+The vendor-independent part of an RFQ (requirements from the analysis,
+extracted parameters and cited standards) is parsed and classified once.
+Each vendor then only adds a short cover from a template, so 20 packets
+cost one analysis plus 20 ReportLab renders. Renders run on a process pool,
+are cached by content hash (same analysis, template and vendor details give
+the same PDF). All renders finish before the zip is streamed, so a failed
+render is reported as an error instead of a truncated archive.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from pathlib import Path
+from string import Template
+from xml.sax.saxutils import escape
+from pdf_Convertor import create_styled_document
+from services.format_service import (
+    BLANK,
+    BODY,
+    BULLET,
+    SECTION,
+    classify_line,
+    classify_rendered_line,
+    clean_text,
+)
+from services.parameter_service import ParameterTable
+from services.report_service import atomic_path
+from services.revision_service import ANALYSIS_HEADING_RE
+
+logger = logging.getLogger(__name__)
+
+RFQ_DIR = Path("processed") / "rfq"
+
+# Cover pages; lines are classified like formatted report text, so
+# "[SUBSECTION] " and "•" prefixes work. Unknown placeholders are left as is.
+RFQ_TEMPLATES = {
+    "standard": """REQUEST FOR QUOTATION
+RFQ No: $rfq_number
+Issued: $issue_date
+Quotation due: $due_date
+
+[SUBSECTION] Vendor
+$vendor_name
+Attention: $vendor_contact $vendor_email
+
+[SUBSECTION] Subject
+Supply in accordance with the technical requirements below for: $focus
+Reference documents: $documents
+
+[SUBSECTION] Instructions to Bidders
+• Quote against every requirement listed below and state any deviation explicitly, citing the clause.
+• Confirm compliance with all listed codes and standards.
+• Submit the technical and commercial offer by the due date quoting RFQ No $rfq_number.
+$vendor_notes
+""",
+    "brief": """REQUEST FOR QUOTATION
+RFQ No: $rfq_number - $vendor_name
+Quotation due: $due_date
+Scope: $focus ($documents)
+$vendor_notes
+""",
+}
+
+PARAMETER_LIMIT = 80
+SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class RFQPacket:
+    """Vendor-independent RFQ content, classified once for every vendor."""
+
+    def __init__(
+        self,
+        analysis: str,
+        focus: str,
+        documents: list[str],
+        parameters: ParameterTable = None,
+        references: str = "",
+    ):
+        self.focus = focus or "Entire Document"
+        self.documents = documents
+        self.sections: dict[str, list[tuple[str, str]]] = {}
+        self.parameter_lines = self._parameter_lines(parameters)
+        self.reference_lines = self._reference_lines(references)
+
+        current = "0"
+        for raw_line in clean_text(analysis).split("\n"):
+            line = raw_line.strip()
+            if not line:
+                continue
+            heading = ANALYSIS_HEADING_RE.match(line)
+            if heading:
+                current = heading.group("number")
+                self.sections.setdefault(current, []).extend([(BLANK, ""), (SECTION, line)])
+            else:
+                self.sections.setdefault(current, []).append(classify_line(line))
+
+        digest = hashlib.sha256()
+        for part in (analysis, self.focus, json.dumps(documents), json.dumps(self.parameter_lines),
+                     json.dumps(self.reference_lines)):
+            digest.update(part.encode("utf-8"))
+        self.fingerprint = digest.hexdigest()
+
+    @staticmethod
+    def _parameter_lines(parameters: ParameterTable) -> list[tuple[str, str]]:
+        if not parameters:
+            return []
+        lines, seen = [], set()
+        for row in parameters.rows():
+            key = (row["name"], row["value"], row["unit"])
+            if not row["name"] or key in seen:
+                continue
+            seen.add(key)
+            value = int(row["value"]) if row["value"] == int(row["value"]) else row["value"]
+            lines.append((BULLET, escape(f"{row['name']}: {value} {row['unit']} (From {row['file']}, Page {row['page']})")))
+            if len(lines) >= PARAMETER_LIMIT:
+                break
+        return [(BLANK, ""), (SECTION, "Key Design Parameters")] + lines if lines else []
+
+    @staticmethod
+    def _reference_lines(references: str) -> list[tuple[str, str]]:
+        lines = []
+        for entry in references.splitlines():
+            designation, _, cited = entry.partition(" | ")
+            lines.append((BULLET, escape(f"{designation} (cited in {cited})" if cited else designation)))
+        return [(BLANK, ""), (SECTION, "Referenced Codes and Standards")] + lines if lines else []
+
+    def lines(self, scope: list = None) -> list[tuple[str, str]]:
+        """Requirement lines, limited to the analysis sections in ``scope``."""
+        wanted = {str(number) for number in scope} if scope else None
+        lines = []
+        for number, section in self.sections.items():
+            if number == "0" or wanted is None or number in wanted:
+                lines.extend(section)
+        return lines + self.parameter_lines + self.reference_lines
+
+
+def vendor_lines(
+    packet: RFQPacket,
+    vendor: dict,
+    template: str,
+    rfq_number: str,
+    due_date: str = "",
+) -> list[tuple[str, str]]:
+    """Full classified RFQ for one vendor: template cover plus shared content."""
+    # Values are ReportLab paragraph markup: "<sales@acme.com>" or "A&B" must be escaped
+    fields = {
+        "rfq_number": rfq_number,
+        "issue_date": datetime.now().strftime("%B %d, %Y"),
+        "due_date": due_date or "To be advised",
+        "vendor_name": vendor["name"],
+        "vendor_contact": vendor.get("contact", ""),
+        "vendor_email": vendor.get("email", ""),
+        "vendor_notes": vendor.get("notes", ""),
+        "focus": packet.focus,
+        "documents": ", ".join(packet.documents) or "-",
+    }
+    cover = Template(template).safe_substitute(
+        {name: escape(str(value or "")) for name, value in fields.items()}
+    )
+    lines = [classify_rendered_line(line) for line in cover.strip().split("\n")]
+    return lines + packet.lines(vendor.get("scope")) + [(BLANK, ""), (BODY, f"END OF RFQ {escape(rfq_number)}")]
+
+
+def render_rfq(lines: list[tuple[str, str]], output_path: str) -> str:
+    """Render one RFQ (run in a worker process); written atomically."""
+    with atomic_path(Path(output_path)) as tmp_path:
+        create_styled_document("", str(tmp_path), lines, title="Request for Quotation")
+    return output_path
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Shared render pool, started on first use (spawned, so no model state is forked)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv("RFQ_RENDER_WORKERS", max(1, min(4, os.cpu_count() or 1))))
+            _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def generate_rfqs(
+    packet: RFQPacket,
+    vendors: list[dict],
+    template: str = "standard",
+    due_date: str = "",
+    rfq_prefix: str = "RFQ",
+    output_dir: Path = RFQ_DIR,
+):
+    """
+    Yield ``(zip_entry_name, pdf_path)`` for every vendor as its RFQ is ready.
+    ``template`` is a name from ``RFQ_TEMPLATES`` or the template text itself.
+    """
+    template_text = RFQ_TEMPLATES.get(template, template)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    pending = {}
+    names = set()
+    for index, vendor in enumerate(vendors, 1):
+        rfq_number = f"{rfq_prefix}-{index:03d}"
+        name = f"{rfq_number}_{SAFE_NAME_RE.sub('_', vendor['name']).strip('_') or 'vendor'}.pdf"
+        while name in names:
+            name = f"{Path(name).stem}_{index}.pdf"
+        names.add(name)
+
+        key = hashlib.sha256(json.dumps(
+            [packet.fingerprint, template_text, vendor, rfq_number, due_date, date.today().isoformat()],
+            sort_keys=True
+        ).encode("utf-8")).hexdigest()[:32]
+        output_path = output_dir / f"{key}.pdf"
+        if output_path.exists():
+            yield name, output_path
+            continue
+        lines = vendor_lines(packet, vendor, template_text, rfq_number, due_date)
+        pending[get_render_pool().submit(render_rfq, lines, str(output_path))] = name
+
+    logger.info(f"RFQs: {len(vendors) - len(pending)} reused, {len(pending)} rendering")
+    for future in as_completed(pending):
+        yield pending[future], Path(future.result())
+
+
+class _ZipSink:
+    """Write-only buffer that lets ``zipfile`` stream to an unseekable target."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    """Zip ``(name, path)`` pairs on the fly, yielding bytes as each file is added."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, path in entries:
+            archive.write(path, name)
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,207 @@
+"""
+CPU thread and device scheduling for Marker extractions.
+
+Devices are probed once, on first use, instead of on every file; probing
+initialises CUDA, so it must not happen at import in a parent that later
+forks worker processes. Extractions
+run in a fixed number of worker slots; each slot is pinned to a device
+(a specific GPU when present, otherwise the CPU) and the torch intra-op
+thread pool is sized so the slots together use the cores exactly once
+instead of oversubscribing them. A job is only admitted to a slot when
+the host (or its GPU) has room for its estimated memory.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# Rough Marker footprint: model weights per slot plus working set per page
+MODEL_MEMORY_BYTES = 3 * 1024**3
+PAGE_MEMORY_BYTES = 40 * 1024**2
+
+
+def probe_devices() -> list[str]:
+    """Return the torch devices available to extraction workers."""
+    if torch.cuda.is_available():
+        devices = [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+        for i, device in enumerate(devices):
+            logger.info(f"Extraction device {device}: {torch.cuda.get_device_name(i)}")
+        return devices
+    logger.info(
+        f"CUDA not available (PyTorch {torch.__version__}, built with CUDA: "
+        f"{torch.cuda.is_built()}); extracting on CPU"
+    )
+    return ["cpu"]
+
+
+_devices = None
+_devices_lock = threading.Lock()
+
+
+def get_devices() -> list[str]:
+    """Devices of this process, probed on first call."""
+    global _devices
+    with _devices_lock:
+        if _devices is None:
+            _devices = probe_devices()
+        return _devices
+
+
+def available_memory(device: str) -> int:
+    """Free bytes on ``device``, or ``None`` when it can't be determined."""
+    if device.startswith("cuda"):
+        free, _ = torch.cuda.mem_get_info(torch.device(device))
+        return free
+    try:
+        with open("/proc/meminfo", "r") as fh:
+            for line in fh:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        return None
+
+
+def estimate_job_memory(page_count: int) -> int:
+    """Working memory needed to extract ``page_count`` pages (models excluded)."""
+    return max(page_count, 1) * PAGE_MEMORY_BYTES
+
+
+def configure_worker(threads: int, counter=None, device: str = None) -> None:
+    """
+    Process-pool initializer: give this process ``threads`` intra-op threads
+    and pin it to ``device``. Without a device, workers take the devices
+    round-robin by their start order, drawn from ``counter`` (a shared
+    ``multiprocessing.Value("i")`` passed to every worker).
+    """
+    torch.set_num_threads(threads)
+    os.environ["TORCH_THREADS_PER_WORKER"] = str(threads)
+    if device is None:
+        devices = get_devices()
+        slot = 0
+        if counter is not None:
+            with counter.get_lock():
+                slot = counter.value
+                counter.value += 1
+        device = devices[slot % len(devices)]
+    os.environ["EXTRACTION_DEVICE"] = device
+    logger.info(f"Extraction worker {os.getpid()}: device {device}, {threads} threads")
+
+
+class ExtractionSlot:
+    """One worker slot: a device and the Marker models loaded on it."""
+
+    def __init__(self, slot_id: int, device: str):
+        self.slot_id = slot_id
+        self.device = device
+        self._models = None
+
+    def models(self, loader) -> dict:
+        """Load Marker models on this slot's device on first use."""
+        if self._models is None:
+            model_dict = loader()
+            if model_dict is None:
+                raise ValueError(
+                    "Failed to create model dictionary - Marker models not initialized"
+                )
+            if self.device != "cpu":
+                for key in model_dict:
+                    if model_dict[key] is not None and hasattr(model_dict[key], "to"):
+                        model_dict[key] = model_dict[key].to(torch.device(self.device))
+            self._models = model_dict
+        return self._models
+
+
+class ExtractionScheduler:
+    """Fixed pool of device-pinned slots with memory-based admission."""
+
+    def __init__(self, workers: int = None, threads_per_worker: int = None, device: str = None):
+        workers = workers or int(os.getenv("EXTRACTION_WORKERS", "1"))
+        cores = os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker or int(
+            os.getenv("TORCH_THREADS_PER_WORKER", max(cores // workers, 1))
+        )
+        device = device or os.getenv("EXTRACTION_DEVICE")
+        devices = [device] if device else get_devices()
+        self.slots = [ExtractionSlot(i, devices[i % len(devices)]) for i in range(workers)]
+        self._free = list(self.slots)
+        self._reserved: dict[str, int] = {}
+        self._condition = threading.Condition()
+
+        # torch's intra-op pool is per process: size it for the slot count
+        torch.set_num_threads(self.threads_per_worker)
+        logger.info(
+            f"Extraction scheduler: {workers} slot(s) on {sorted(set(s.device for s in self.slots))}, "
+            f"{self.threads_per_worker} torch threads per slot"
+        )
+
+    def _fits(self, slot: ExtractionSlot, needed: int) -> bool:
+        free = available_memory(slot.device)
+        if free is None:
+            return True
+        if slot._models is None:
+            needed += MODEL_MEMORY_BYTES
+        return free - self._reserved.get(slot.device, 0) >= needed
+
+    @contextmanager
+    def slot(self, page_count: int = 1, timeout: float = None):
+        """
+        Block until a slot is free and its device has memory for the job,
+        then yield the slot. Raises ``TimeoutError`` after ``timeout`` seconds.
+        """
+        needed = estimate_job_memory(page_count)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                # An idle scheduler always admits, so oversized jobs can't starve
+                idle = len(self._free) == len(self.slots)
+                chosen = next(
+                    (s for s in self._free if idle or self._fits(s, needed)), None
+                )
+                if chosen is not None:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No extraction slot became available")
+                # Re-check memory periodically as well as on slot release
+                self._condition.wait(timeout=1.0 if remaining is None else min(remaining, 1.0))
+            self._free.remove(chosen)
+            self._reserved[chosen.device] = self._reserved.get(chosen.device, 0) + needed
+        try:
+            yield chosen
+        finally:
+            with self._condition:
+                self._reserved[chosen.device] -= needed
+                self._free.append(chosen)
+                self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "slots": len(self.slots),
+                "busy": len(self.slots) - len(self._free),
+                "threads_per_slot": self.threads_per_worker,
+                "devices": [slot.device for slot in self.slots],
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ExtractionScheduler:
+    """Process-wide scheduler, created on first use (after any worker setup)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ExtractionScheduler()
+        return _scheduler
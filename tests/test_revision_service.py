@@ -0,0 +1,114 @@
+from services.markdown_service import join_pages
+from services.revision_service import merge_analysis, parse_document_identity, section_delta
+
+OLD_TEXT = join_pages({
+    1: "# 1.0 Scope\n\nThis specification covers atmospheric storage tanks for crude service.\n",
+    2: (
+        "# 2.0 Design Data\n\n"
+        "Table 3 - Design Data\n\n"
+        "| Parameter | Value |\n"
+        "|-----------|-------|\n"
+        "| Design pressure | 5 barg |\n"
+        "| Design temperature | 65 °C |\n"
+    ),
+    3: "# 3.0 Testing\n\nHydrostatic test shall be witnessed by the owner inspector.\n",
+})
+NEW_TEXT = OLD_TEXT.replace("5 barg", "7 barg")
+
+PREVIOUS_ANALYSIS = """1. Purpose and Scope of Documents:
+- Atmospheric storage tanks for crude service (From Section 1.0)
+
+3. Design and Performance Requirements:
+- Design pressure 5 barg (From Table 3, Page 2)
+- Design temperature 65 °C (From "7650-8230-SP-100-0001_A6_Tanks.pdf", Table 3 - Design Data, Page 2)
+
+6. Execution, Testing, and Quality Requirements:
+- Hydrostatic test witnessed by owner inspector (From Page 3)
+"""
+UPDATE = """3. Design and Performance Requirements:
+- Design pressure 7 barg (From Table 3, Page 2)
+- Design temperature 65 °C (From Table 3, Page 2)
+"""
+
+
+def revision_info(old_text, new_text):
+    return {
+        "document": "7650-8230-SP-100-0001",
+        "revision": "A14",
+        "previous": "A6",
+        "changed_pages": [3],
+        "delta": section_delta(old_text, new_text),
+        "previous_text": old_text,
+    }
+
+
+def test_parse_document_identity():
+    assert parse_document_identity("7650-8230-SP-100-0001_A6_Piping Standard.pdf") == (
+        "7650-8230-SP-100-0001", "A6"
+    )
+    assert parse_document_identity("10080-1-DBD-GE-001 Basic Engineering Design Data Rev 2.pdf") == (
+        "10080-1-DBD-GE-001", "2"
+    )
+    assert parse_document_identity("10080-1-SS-ME-004.pdf") == ("10080-1-SS-ME-004", None)
+    assert parse_document_identity("nozzle_load_analysis_test.pdf") == (None, None)
+
+
+def test_section_delta():
+    delta = section_delta(OLD_TEXT, NEW_TEXT)
+    assert delta["changed"] == ["Section 2.0"]
+    assert delta["added"] == [] and delta["removed"] == []
+    assert "7 barg" in delta["changed_text"]
+    assert "Hydrostatic" not in delta["changed_text"]
+
+
+def test_section_delta_added_and_removed():
+    new_text = OLD_TEXT.replace("# 3.0 Testing", "# 4.0 Inspection")
+    delta = section_delta(OLD_TEXT, new_text)
+    assert delta["added"] == ["Section 4.0"]
+    assert delta["removed"] == ["Section 3.0"]
+    assert delta["changed"] == []
+
+
+def test_section_delta_ignores_page_breaks():
+    assert section_delta(OLD_TEXT, OLD_TEXT.replace("\n\n{1}", "\n\n\n{1}"))["changed"] == []
+
+
+def test_merge_analysis_drops_bullets_sourced_from_changed_sections():
+    merged = merge_analysis(PREVIOUS_ANALYSIS, UPDATE, revision_info(OLD_TEXT, NEW_TEXT))
+
+    assert merged.startswith("Revision Changes (A6 to A14):")
+    assert "Design pressure 7 barg" in merged
+    # Labelled by table or file only, but sourced from the changed Section 2.0
+    assert "5 barg" not in merged
+    assert merged.count("Design temperature 65 °C") == 1
+    # Unchanged sections keep their bullets, whatever their labels
+    assert "Atmospheric storage tanks for crude service (From Section 1.0)" in merged
+    assert "Hydrostatic test witnessed by owner inspector (From Page 3)" in merged
+
+
+def test_merge_analysis_drops_new_bullets_repeating_kept_ones():
+    update = UPDATE + """
+6. Execution, Testing, and Quality Requirements:
+- Hydrostatic test  witnessed by owner inspector (From Section 3.0, Page 3)
+"""
+    merged = merge_analysis(PREVIOUS_ANALYSIS, update, revision_info(OLD_TEXT, NEW_TEXT))
+    assert merged.count("Hydrostatic test") == 1
+    assert "Hydrostatic test witnessed by owner inspector (From Page 3)" in merged
+    assert "Design pressure 7 barg" in merged
+
+
+def test_merge_analysis_replaces_earlier_change_summary():
+    info = revision_info(OLD_TEXT, NEW_TEXT)
+    merged = merge_analysis(PREVIOUS_ANALYSIS, UPDATE, info)
+    again = merge_analysis(merged, UPDATE, info)
+    assert again.count("Revision Changes (") == 1
+    assert again.count("Design pressure 7 barg") == 1
+
+
+def test_merge_analysis_without_previous_text_falls_back_to_labels():
+    info = revision_info(OLD_TEXT, NEW_TEXT)
+    del info["previous_text"]
+    previous = PREVIOUS_ANALYSIS.replace("(From Table 3, Page 2)", "(From Section 2.0)")
+    merged = merge_analysis(previous, UPDATE, info)
+    assert "5 barg" not in merged
+    assert "Hydrostatic test" in merged